@@ -1,9 +1,22 @@
 import os
-import google.generativeai as genai
-from flask import Flask, render_template_string, request, jsonify, session
+import math
+import sys
+import random
+import sqlite3
+from flask import Flask, render_template_string, request, jsonify, session, g
 from dotenv import load_dotenv
 import requests
+import re
 import time
+import datetime
+import hashlib
+import json
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from itertools import zip_longest
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 
 # Load .env variables
 load_dotenv()
@@ -12,47 +25,742 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 HIX_API_KEY = os.getenv('HIX_API_KEY')
 
-# Validate API keys
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-if not HIX_API_KEY:
-    raise ValueError("HIX_API_KEY not found in environment variables")
+HIX_BASE_URL = "https://bypass.hix.ai"
 
 # Initialize Flask
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
+# Archived blogs belong to the session that created them, so the cookie key
+# has to be shared by all workers and survive restarts. Without SECRET_KEY
+# every worker signs with its own random key and sessions (and with them
+# access to earlier archive entries) only last for that process.
+app.secret_key = os.getenv('SECRET_KEY') or os.urandom(24)
+
+# The Gemini SDK and the HTTP session are expensive to import and set up, so
+# they are created on first use (or by prewarm() right after a worker forks)
+# instead of at import time.
+_genai = None
+_http_session = None
+_init_lock = threading.Lock()
+
+def get_genai():
+    """Import and configure the Gemini SDK once per process."""
+    global _genai
+    if _genai is None:
+        with _init_lock:
+            if _genai is None:
+                if not GEMINI_API_KEY:
+                    raise ValueError("GEMINI_API_KEY not found in environment variables")
+                import google.generativeai as genai
+                genai.configure(api_key=GEMINI_API_KEY)
+                _genai = genai
+    return _genai
+
+def get_http_session():
+    """Shared keep-alive session for HIX requests."""
+    global _http_session
+    if _http_session is None:
+        with _init_lock:
+            if _http_session is None:
+                http = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(HIX_CONCURRENCY, 10))
+                http.mount('https://', adapter)
+                _http_session = http
+    return _http_session
+
+def _gemini_model(name):
+    return get_genai().GenerativeModel(name)
+
+# On-demand profiling. A request is profiled when it carries PROFILE_HEADER
+# set to PROFILE_TOKEN (header profiling is off while no token is configured)
+# or is picked by PROFILE_SAMPLE_RATE; its stacks are written in collapsed
+# format (flamegraph.pl / speedscope) to PROFILE_DIR alongside a JSON file
+# with wall time per pipeline stage. At most PROFILE_MAX_ACTIVE requests are
+# sampled at once and only the newest PROFILE_MAX_FILES profiles are kept.
+PROFILE_HEADER = 'X-Profile'
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_MAX_ACTIVE = int(os.getenv('PROFILE_MAX_ACTIVE', 2))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 100))
+
+_profile_slots = threading.BoundedSemaphore(PROFILE_MAX_ACTIVE)
+
+_profile_local = threading.local()
+
+class RequestProfiler:
+    """
+    Sample one thread's stack from a background thread and attribute each
+    sample, and the wall time between stage boundaries, to the current stage.
+    """
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = {}
+        self.stage_times = {}
+        self._stages = ['app']
+        self._mark = self.started = time.time()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(f"stage:{self._stages[-1]}")
+            key = ';'.join(reversed(stack))
+            self.samples[key] = self.samples.get(key, 0) + 1
+
+    def _charge(self):
+        now = time.time()
+        stage = self._stages[-1]
+        self.stage_times[stage] = self.stage_times.get(stage, 0.0) + now - self._mark
+        self._mark = now
+
+    def enter(self, stage):
+        self._charge()
+        self._stages.append(stage)
+
+    def exit(self):
+        self._charge()
+        self._stages.pop()
+
+    def stop(self):
+        self._charge()
+        self._stop.set()
+        self._thread.join()
+        return time.time() - self.started
+
+    def write(self, name, meta):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, name)
+        with open(path + '.folded', 'w') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+        with open(path + '.json', 'w') as f:
+            json.dump(dict(meta, stages={k: round(v, 4) for k, v in self.stage_times.items()},
+                           samples=sum(self.samples.values()), interval=self.interval), f, indent=2)
+        prune_profiles()
+        return path
+
+def prune_profiles(keep=PROFILE_MAX_FILES):
+    """Delete all but the newest `keep` profiles in PROFILE_DIR."""
+    names = sorted({os.path.splitext(name)[0] for name in os.listdir(PROFILE_DIR)
+                    if name.endswith(('.folded', '.json'))}, reverse=True)
+    for name in names[keep:]:
+        for extension in ('.folded', '.json'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name + extension))
+            except FileNotFoundError:
+                pass
+
+class profile_stage:
+    """Attribute the enclosed block to a stage if this thread is being profiled."""
+
+    __slots__ = ('stage', 'profiler')
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.profiler = getattr(_profile_local, 'profiler', None)
+
+    def __enter__(self):
+        if self.profiler is not None:
+            self.profiler.enter(self.stage)
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is not None:
+            self.profiler.exit()
+        return False
+
+def _profile_requested():
+    if PROFILE_TOKEN and request.headers.get(PROFILE_HEADER) == PROFILE_TOKEN:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+@app.before_request
+def start_profiler():
+    if _profile_requested() and _profile_slots.acquire(blocking=False):
+        g.profiler = _profile_local.profiler = RequestProfiler(threading.get_ident()).start()
+
+@app.after_request
+def stop_profiler(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        _profile_local.profiler = None
+        elapsed = profiler.stop()
+        _profile_slots.release()
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint}-{uuid.uuid4().hex[:8]}"
+        try:
+            profiler.write(name, {'path': request.path, 'status': response.status_code, 'wall': round(elapsed, 4)})
+            response.headers['X-Profile-Id'] = name
+        except OSError as e:
+            print(f"Could not write profile {name}: {e}")
+    return response
+
+@app.teardown_request
+def discard_profiler(exc):
+    # Requests that failed before after_request still free their sampler
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        _profile_local.profiler = None
+        profiler.stop()
+        _profile_slots.release()
+
+# Priority lanes for upstream (Gemini and HIX) calls. Every lane keeps
+# UPSTREAM_RESERVED slots nobody else may use; the rest of the
+# UPSTREAM_CONCURRENCY slots per worker are shared. Waiting calls are started
+# in weighted fair order across lanes and sessions, so one session's queue of
+# regenerations interleaves with everyone else's requests instead of running
+# ahead of them. A call that waits longer than UPSTREAM_QUEUE_TIMEOUT for a
+# slot gives up with UpstreamBusyError.
+LANES = ('interactive', 'generation', 'batch')
+UPSTREAM_CONCURRENCY = int(os.getenv('UPSTREAM_CONCURRENCY', 8))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv('UPSTREAM_QUEUE_TIMEOUT', 60))
+UPSTREAM_RESERVED = {'interactive': 2, 'generation': 1, 'batch': 0}
+LANE_WEIGHTS = {'interactive': 4, 'generation': 2, 'batch': 1}
+ROUTE_LANES = {
+    'humanize_blog': 'interactive',
+    'generate_faq': 'interactive',
+    'regenerate_blog_section': 'interactive',
+    'save_edits': 'interactive',
+    'index': 'generation',
+    'generate_general_blog': 'generation',
+    'regenerate_content': 'generation',
+}
+# Clients can demote their own requests (e.g. scripted bulk runs), never promote them
+PRIORITY_HEADER = 'X-Priority'
+
+_priority_local = threading.local()
+
+def current_priority():
+    """The (lane, session id) upstream calls on this thread are charged to."""
+    return getattr(_priority_local, 'value', None) or ('batch', None)
+
+class priority:
+    """Charge upstream calls made inside the block to a lane and session."""
+
+    def __init__(self, lane, session_id=None):
+        self.value = (lane, session_id)
+
+    def __enter__(self):
+        self.previous = getattr(_priority_local, 'value', None)
+        _priority_local.value = self.value
+        return self
+
+    def __exit__(self, *exc):
+        _priority_local.value = self.previous
+        return False
+
+class UpstreamBusyError(RuntimeError):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class UpstreamScheduler:
+    """
+    Concurrency limiter with reserved capacity per lane and start-time fair
+    queueing: each waiting call is tagged max(virtual time, its session's last
+    tag) + 1 / lane weight and the lowest tag that fits a free slot goes next.
+    """
 
-# Two different models for different tasks
-blog_generation_model = genai.GenerativeModel("gemini-1.5-flash")
-grammar_improvement_model = genai.GenerativeModel("gemini-1.5-flash")
+    def __init__(self, capacity=UPSTREAM_CONCURRENCY, reserved=None, weights=None, timeout=UPSTREAM_QUEUE_TIMEOUT):
+        self.capacity = capacity
+        self.reserved = dict(UPSTREAM_RESERVED if reserved is None else reserved)
+        self.weights = dict(LANE_WEIGHTS if weights is None else weights)
+        # Lanes without a reservation only ever get the shared slots
+        if capacity <= sum(self.reserved.values()):
+            raise ValueError(f"Upstream capacity {capacity} must exceed the {sum(self.reserved.values())} "
+                             f"reserved slots ({self.reserved})")
+        self.timeout = timeout
+        self.in_flight = {lane: 0 for lane in self.reserved}
+        self.waiting = []
+        self.vtime = 0.0
+        self._tags = {}
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def _fits(self, lane):
+        if self.in_flight[lane] < self.reserved[lane]:
+            return True
+        held = sum(max(self.reserved[l], n) for l, n in self.in_flight.items())
+        return held < self.capacity
+
+    def _next(self):
+        eligible = [entry for entry in self.waiting if self._fits(entry[2])]
+        return min(eligible) if eligible else None
+
+    def acquire(self, lane, session_id=None):
+        key = (lane, session_id)
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            tag = max(self.vtime, self._tags.get(key, 0.0)) + 1.0 / self.weights[lane]
+            self._tags[key] = tag
+            self._seq += 1
+            entry = (tag, self._seq, lane)
+            self.waiting.append(entry)
+            while self._next() is not entry:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.waiting.remove(entry)
+                    # Calls queued behind this one may fit now
+                    self._cond.notify_all()
+                    raise UpstreamBusyError(f"No upstream slot free for the {lane} lane within "
+                                            f"{self.timeout:g} s", retry_after=self.timeout / 2)
+                self._cond.wait(remaining)
+            self.waiting.remove(entry)
+            self.in_flight[lane] += 1
+            self.vtime = tag
+            if not self.waiting:
+                # Idle: forget old tags so returning sessions aren't penalised
+                self._tags.clear()
+            self._cond.notify_all()
+
+    def release(self, lane):
+        with self._cond:
+            self.in_flight[lane] -= 1
+            self._cond.notify_all()
+
+    def slot(self):
+        return _SchedulerSlot(self)
+
+    def snapshot(self):
+        with self._cond:
+            waiting = {lane: 0 for lane in self.in_flight}
+            for entry in self.waiting:
+                waiting[entry[2]] += 1
+            return {'capacity': self.capacity, 'in_flight': dict(self.in_flight), 'waiting': waiting}
+
+class _SchedulerSlot:
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+
+    def __enter__(self):
+        self.lane, session_id = current_priority()
+        self.scheduler.acquire(self.lane, session_id)
+        return self
+
+    def __exit__(self, *exc):
+        self.scheduler.release(self.lane)
+        return False
+
+upstream_scheduler = UpstreamScheduler()
+
+def session_id():
+    if 'sid' not in session:
+        # Kept for PERMANENT_SESSION_LIFETIME rather than until the browser closes
+        session.permanent = True
+        session['sid'] = uuid.uuid4().hex
+    return session['sid']
+
+@app.before_request
+def assign_lane():
+    lane = ROUTE_LANES.get(request.endpoint)
+    if lane is not None:
+        if request.headers.get(PRIORITY_HEADER) == 'batch':
+            lane = 'batch'
+        _priority_local.value = (lane, session_id())
+
+@app.teardown_request
+def clear_lane(exc):
+    _priority_local.value = None
+
+# Model tiers, each an ordered list of models to fail over through, and the
+# tier every pipeline stage runs on. Both can be overridden from the
+# environment, e.g. GEMINI_LIGHT_MODELS="gemini-1.5-flash-8b,gemini-1.5-flash"
+# and MODEL_ROUTES="summary=heavy,faq=heavy".
+MODEL_TIERS = {
+    'heavy': os.getenv('GEMINI_HEAVY_MODELS', 'gemini-1.5-flash,gemini-1.5-flash-8b').split(','),
+    'light': os.getenv('GEMINI_LIGHT_MODELS', 'gemini-1.5-flash-8b,gemini-1.5-flash').split(','),
+}
+STAGE_TIERS = {
+    'outline': 'heavy',
+    'section': 'heavy',
+    'keyword_verification': 'heavy',
+    'grammar': 'heavy',
+    'summary': 'light',
+    'faq': 'light',
+    'humanize': 'light',
+    'adapt': 'heavy',
+}
+for route in os.getenv('MODEL_ROUTES', '').split(','):
+    if '=' in route:
+        stage, tier = route.split('=', 1)
+        STAGE_TIERS[stage.strip()] = tier.strip()
+
+# A model is considered degraded while its smoothed error rate or latency is
+# over these limits; it gets retried once MODEL_COOLDOWN_SECONDS have passed
+# since its last failure or slow call.
+MODEL_MAX_ERROR_RATE = float(os.getenv('MODEL_MAX_ERROR_RATE', 0.5))
+MODEL_SLOW_SECONDS = float(os.getenv('MODEL_SLOW_SECONDS', 45))
+MODEL_COOLDOWN_SECONDS = float(os.getenv('MODEL_COOLDOWN_SECONDS', 60))
+
+class ModelStats:
+    """Exponentially weighted latency and error rate of one model."""
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.latency = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.last_degraded = 0.0
+
+    def record(self, latency, ok):
+        self.calls += 1
+        self.errors += not ok
+        self.error_rate += self.alpha * ((not ok) - self.error_rate)
+        if ok:
+            self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+        if not ok or latency > MODEL_SLOW_SECONDS:
+            self.last_degraded = time.monotonic()
+
+    def degraded(self):
+        unhealthy = self.error_rate > MODEL_MAX_ERROR_RATE or (self.latency or 0) > MODEL_SLOW_SECONDS
+        return unhealthy and time.monotonic() - self.last_degraded < MODEL_COOLDOWN_SECONDS
+
+def _is_client_error(e):
+    # Requests Gemini rejects as invalid (HTTP 4xx other than timeouts and
+    # rate limits) fail on every model and say nothing about its health
+    code = getattr(e, 'code', None)
+    return isinstance(code, int) and 400 <= code < 500 and code not in (408, 429)
+
+class ModelRouter:
+    """
+    Route each pipeline stage to a model of its tier.
 
-def split_text_into_chunks(text, max_words=500):
-    words = text.split()
-    chunks = []
-    current_chunk = []
-    current_word_count = 0
+    Healthy models are tried in configured order, degraded ones last, and a
+    failing call fails over to the next model of the tier. Invalid requests
+    are raised straight away without counting against the model.
+    """
+
+    def __init__(self, tiers, stage_tiers, model_factory=None):
+        self.tiers = tiers
+        self.stage_tiers = stage_tiers
+        self.model_factory = model_factory or _gemini_model
+        self._models = {}
+        self._stats = {}
+        # Time to first streamed token, split by whether the shared blog
+        # context came from a Gemini cache: {cached: [total_seconds, calls]}
+        self._ttft = {True: [0.0, 0], False: [0.0, 0]}
+        self._lock = threading.Lock()
+
+    def model(self, name):
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = self.model_factory(name)
+            return self._models[name]
+
+    def candidates(self, stage):
+        names = self.tiers[self.stage_tiers.get(stage, 'heavy')]
+        with self._lock:
+            return sorted(names, key=lambda name: name in self._stats and self._stats[name].degraded())
+
+    def record(self, name, latency, ok):
+        with self._lock:
+            self._stats.setdefault(name, ModelStats()).record(latency, ok)
+
+    def generate(self, prompt, stage, context=None, generation_config=None):
+        last_error = None
+        for name in self.candidates(stage):
+            if context is None:
+                model, text, cached = self.model(name), prompt, False
+            else:
+                model, text, cached = context.bind(name, self, prompt)
+            start = time.monotonic()
+            first_token = None
+            try:
+                response = model.generate_content(text, stream=True, generation_config=generation_config)
+                for _ in response:
+                    if first_token is None:
+                        first_token = time.monotonic() - start
+            except Exception as e:
+                if _is_client_error(e):
+                    raise
+                self.record(name, time.monotonic() - start, ok=False)
+                print(f"Model {name} failed for {stage}: {e}")
+                last_error = e
+                continue
+            self.record(name, time.monotonic() - start, ok=True)
+            with self._lock:
+                self._ttft[cached][0] += first_token or 0.0
+                self._ttft[cached][1] += 1
+            return response
+        raise last_error
+
+    def ttft_report(self):
+        with self._lock:
+            return {('cached' if cached else 'inline'): {'calls': calls, 'avg_ms': round(total * 1000 / calls, 1) if calls else None}
+                    for cached, (total, calls) in self._ttft.items()}
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {'latency': stats.latency, 'error_rate': round(stats.error_rate, 3),
+                           'calls': stats.calls, 'errors': stats.errors, 'degraded': stats.degraded()}
+                    for name, stats in self._stats.items()}
+
+model_router = ModelRouter(MODEL_TIERS, STAGE_TIERS)
+
+# Gemini only caches contexts above a minimum size; shorter prefixes are sent
+# inline, first in the prompt so that identical prefixes line up across calls.
+GEMINI_CACHE_MIN_TOKENS = int(os.getenv('GEMINI_CACHE_MIN_TOKENS', 32768))
+GEMINI_CACHE_TTL_SECONDS = int(os.getenv('GEMINI_CACHE_TTL_SECONDS', 600))
+
+def _create_cached_model(name, prefix):
+    genai = get_genai()
+    cached_content = genai.caching.CachedContent.create(
+        model=f"models/{name}",
+        contents=[prefix],
+        ttl=datetime.timedelta(seconds=GEMINI_CACHE_TTL_SECONDS),
+    )
+    return genai.GenerativeModel.from_cached_content(cached_content=cached_content), cached_content
+
+class BlogContext:
+    """
+    Shared prompt prefix of one blog: product or topic details and keyword
+    rules that the section, summary and FAQ prompts all build on.
+
+    When the prefix is large enough it is uploaded once per model as Gemini
+    cached content and calls only send their own instructions. The caches are
+    deleted when the context is closed and expire after
+    GEMINI_CACHE_TTL_SECONDS in any case. cache_factory(model_name, prefix)
+    must return a (model, cache) pair; tests can pass a local fake.
+    """
 
-    for word in words:
-        current_chunk.append(word)
-        current_word_count += 1
+    def __init__(self, prefix, cache=True, cache_factory=None):
+        self.prefix = prefix
+        self.cache = cache and estimate_tokens(prefix) >= GEMINI_CACHE_MIN_TOKENS
+        self.cache_factory = cache_factory or _create_cached_model
+        self._cached = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def bind(self, name, router, body):
+        """Return (model, prompt, cached) for sending body to model name."""
+        if self.cache:
+            with self._lock:
+                if name not in self._cached:
+                    try:
+                        self._cached[name] = self.cache_factory(name, self.prefix)
+                    except Exception as e:
+                        print(f"Context cache unavailable for {name}: {e}")
+                        self._cached[name] = None
+                entry = self._cached[name]
+            if entry is not None:
+                return entry[0], body, True
+        return router.model(name), f"{self.prefix}\n\n{body}", False
+
+    def close(self):
+        with self._lock:
+            entries, self._cached = self._cached, {}
+        for entry in entries.values():
+            if entry is None:
+                continue
+            try:
+                entry[1].delete()
+            except Exception as e:
+                print(f"Context cache cleanup error: {e}")
+        if entries:
+            print(f"Context cache TTFT: {model_router.ttft_report()}")
+
+# Words are maximal runs of non-whitespace; a word closing with terminal
+# punctuation (optionally followed by quotes/brackets/emphasis) ends a sentence.
+_WORD_RE = re.compile(r'\S+')
+_SENTENCE_END_RE = re.compile(r'[.!?]["\')\]*_]*$')
+_SENTENCE_TAIL = frozenset('.!?"\')]*_')
+# Lines starting with one of these open a new markdown block.
+_BLOCK_START_RE = re.compile(r'(?:#{1,6}|[-*+>|]|\d+[.)]|```)')
+
+def _text_segments(text, max_words):
+    """
+    Scan text once and cut it into sentence / markdown-block segments.
 
-        if current_word_count >= max_words:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = []
-            current_word_count = 0
+    Args:
+        text (str): Text to scan
+        max_words (int): Hard cap on words per segment; run-on sentences are
+            cut on word boundaries once they reach it
 
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
+    Returns:
+        list: (start, end, word_count) offsets into text, in order
+    """
+    segments = []
+    seg_start = None
+    seg_words = 0
+    prev_end = 0
+    heading = False
+
+    for match in _WORD_RE.finditer(text):
+        start = match.start()
+        if seg_start is not None and (start - prev_end > 1 or text[prev_end] != ' '):
+            gap = text[prev_end:start]
+            if '\n' in gap and (heading or gap.count('\n') > 1 or _BLOCK_START_RE.match(text, start)):
+                segments.append((seg_start, prev_end, seg_words))
+                seg_start = None
+
+        if seg_start is None:
+            seg_start = start
+            seg_words = 0
+            heading = text.startswith('#', start)
+
+        seg_words += 1
+        prev_end = match.end()
+
+        if seg_words >= max_words or (not heading and text[prev_end - 1] in _SENTENCE_TAIL
+                                      and _SENTENCE_END_RE.search(text, start, prev_end)):
+            segments.append((seg_start, prev_end, seg_words))
+            seg_start = None
+
+    if seg_start is not None:
+        segments.append((seg_start, prev_end, seg_words))
+
+    return segments
+
+def chunk_spans(text, max_words=500):
+    """
+    Plan chunk boundaries for text without copying it.
 
-    return chunks
+    Chunks end on sentence or markdown-block boundaries, never exceed
+    max_words (run-on sentences are cut on word boundaries to fit), and are
+    balanced so every chunk carries roughly the same number of words.
 
-def humanize_chunk(chunk, api_key=None):
-    api_key = api_key or HIX_API_KEY
-    SUBMIT_URL = "https://bypass.hix.ai/api/hixbypass/v1/submit"
-    OBTAIN_URL = "https://bypass.hix.ai/api/hixbypass/v1/obtain"
+    Args:
+        text (str): Text to be chunked
+        max_words (int): Maximum words per chunk
+
+    Returns:
+        list: (start, end) offsets into text; whitespace between chunks is
+            left out so callers can splice results back in place
+    """
+    segments = _text_segments(text, max_words)
+    if not segments:
+        return []
+
+    total_words = sum(words for _, _, words in segments)
+    chunk_count = -(-total_words // max_words)
+    target = total_words / chunk_count
+
+    spans = []
+    chunk_start = None
+    chunk_words = 0
+    done_words = 0
+    last = len(segments) - 1
+
+    for i, (start, end, words) in enumerate(segments):
+        if chunk_start is None:
+            chunk_start = start
+        chunk_words += words
+        done_words += words
+        if i == last:
+            break
+
+        next_words = segments[i + 1][2]
+        ideal = target * (len(spans) + 1)
+        # Cut here if the next segment would overflow the chunk, or if the
+        # running total is already closer to the ideal cut than it would be
+        # after taking the next segment.
+        if chunk_words + next_words > max_words or abs(done_words - ideal) <= abs(done_words + next_words - ideal):
+            spans.append((chunk_start, end))
+            chunk_start = None
+            chunk_words = 0
+
+    spans.append((chunk_start, segments[last][1]))
+    return spans
+
+def split_text_into_chunks(text, max_words=500):
+    return [text[start:end] for start, end in chunk_spans(text, max_words)]
+
+# HIX polling limits and circuit breaker settings. The breaker opens after
+# HIX_FAILURE_THRESHOLD consecutive failures or timeouts and lets a single
+# probe request through once HIX_RESET_SECONDS have passed.
+HIX_REQUEST_TIMEOUT = float(os.getenv('HIX_REQUEST_TIMEOUT', 10))
+HIX_POLL_INTERVAL = float(os.getenv('HIX_POLL_INTERVAL', 2))
+HIX_POLL_DEADLINE = float(os.getenv('HIX_POLL_DEADLINE', 20))
+HIX_FAILURE_THRESHOLD = int(os.getenv('HIX_FAILURE_THRESHOLD', 3))
+HIX_RESET_SECONDS = float(os.getenv('HIX_RESET_SECONDS', 60))
+# What to do with chunks HIX can't take: 'gemini' rewrites them with the
+# light Gemini tier, 'none' fails /humanize fast while the breaker is open
+HIX_FALLBACK = os.getenv('HIX_FALLBACK', 'gemini')
+
+class HixError(RuntimeError):
+    pass
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over consecutive upstream failures."""
+
+    def __init__(self, name, failure_threshold, reset_seconds):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        return max(self.reset_seconds - (time.monotonic() - self.opened_at), 0) if self.state != 'closed' else 0
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = 'half_open'
+            if self.state == 'half_open':
+                if self._probing:
+                    return False
+                self._probing = True
+            return self.state != 'open'
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"Circuit {self.name} opened after {self.failures} failures")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def cancel_probe(self):
+        """Give back a half-open probe that never reached the upstream."""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self):
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures, 'retry_after': round(self.retry_after(), 1)}
+
+hix_breaker = CircuitBreaker('hix', HIX_FAILURE_THRESHOLD, HIX_RESET_SECONDS)
+
+def _hix_humanize(chunk, api_key):
+    SUBMIT_URL = f"{HIX_BASE_URL}/api/hixbypass/v1/submit"
+    OBTAIN_URL = f"{HIX_BASE_URL}/api/hixbypass/v1/obtain"
     headers = {
         "api-key": api_key,
         "Content-Type": "application/json"
@@ -64,80 +772,887 @@ def humanize_chunk(chunk, api_key=None):
     }
 
     try:
-        submit_response = requests.post(SUBMIT_URL, json=submit_payload, headers=headers)
+        http = get_http_session()
+        submit_response = http.post(SUBMIT_URL, json=submit_payload, headers=headers, timeout=HIX_REQUEST_TIMEOUT)
         submit_response.raise_for_status()
         submit_data = submit_response.json()
 
         if submit_data.get('err_code') != 0:
-            print(f"Submission Error: {submit_data.get('err_msg', 'Unknown error')}")
-            return chunk
+            raise HixError(f"Submission Error: {submit_data.get('err_msg', 'Unknown error')}")
 
         task_id = submit_data['data']['task_id']
 
-        max_attempts = 10
-        for _ in range(max_attempts):
-            time.sleep(2)
-            obtain_response = requests.get(OBTAIN_URL, params={"task_id": task_id}, headers=headers)
+        deadline = time.monotonic() + HIX_POLL_DEADLINE
+        while time.monotonic() < deadline:
+            time.sleep(HIX_POLL_INTERVAL)
+            obtain_response = http.get(OBTAIN_URL, params={"task_id": task_id}, headers=headers,
+                                       timeout=HIX_REQUEST_TIMEOUT)
             obtain_response.raise_for_status()
             obtain_data = obtain_response.json()
 
             if obtain_data.get('err_code') == 0 and obtain_data['data'].get('task_status'):
                 return obtain_data['data'].get('output', chunk)
 
-        print("Humanization task timed out")
-        return chunk
-
+    except HixError:
+        raise
     except Exception as e:
-        print(f"Humanization Error for chunk: {e}")
-        return chunk
+        raise HixError(f"Humanization Error for chunk: {e}") from e
+    raise HixError("Humanization task timed out")
+
+def _gemini_humanize(chunk):
+    rewrite_prompt = f"""Rewrite the following text so it reads as if a skilled human writer wrote it.
+    - Vary sentence length and rhythm, and prefer plain, concrete wording
+    - Keep the meaning, facts, names and approximate length unchanged
+    - Do not add headings, lists, commentary or markdown
+
+    Text:
+    {chunk}
+
+    Provide only the rewritten text."""
+    return generate_text(rewrite_prompt, 'humanize', output_words=len(chunk.split())).strip()
+
+def _humanize_chunk(chunk, api_key):
+    # Returns (text, source) where source is 'hix', 'gemini' or 'original'
+    if hix_breaker.allow():
+        try:
+            with upstream_scheduler.slot():
+                humanized = _hix_humanize(chunk, api_key)
+            hix_breaker.record_success()
+            return humanized, 'hix'
+        except HixError as e:
+            hix_breaker.record_failure()
+            print(e)
+        except UpstreamBusyError as e:
+            hix_breaker.cancel_probe()
+            print(e)
+
+    if HIX_FALLBACK == 'gemini':
+        try:
+            return _gemini_humanize(chunk), 'gemini'
+        except Exception as e:
+            print(f"Gemini humanize fallback error: {e}")
+    return chunk, 'original'
+
+def humanize_chunk(chunk, api_key=None):
+    return _humanize_chunk(chunk, api_key or HIX_API_KEY)[0]
 
-def humanize_text(text, max_words=500):
+# Markdown line classifiers used to keep structure out of HIX requests
+_FENCE_RE = re.compile(r'[ \t]*(```|~~~)')
+_HEADING_RE = re.compile(r'[ \t]*(#{1,6}[ \t]|\*\*[^*\n]+\*\*:?[ \t]*$)')
+_LIST_ITEM_RE = re.compile(r'[ \t]*(?:[-*+]|\d+[.)])[ \t]+')
+_OTHER_BLOCK_RE = re.compile(r'[ \t]*(?:>|\||(?:[-*_][ \t]*){3,}$)')
+_BOLD_RE = re.compile(r'\*\*([^*\n]+?)\*\*')
+
+HUMANIZE_MIN_BLOCK_WORDS = int(os.getenv('HUMANIZE_MIN_BLOCK_WORDS', 50))
+HIX_CONCURRENCY = int(os.getenv('HIX_CONCURRENCY', 4))
+
+def parse_markdown_blocks(text):
+    """
+    Split markdown text into a flat list of top-level blocks.
+
+    Args:
+        text (str): Markdown text
+
+    Returns:
+        list: (kind, start, end) tuples in document order, where kind is one of
+            'heading', 'code', 'list', 'other' or 'prose'. Blank lines between
+            blocks are not covered by any block.
+    """
+    blocks = []
+    fence_start = None
+    prose_start = None
+    item = None
+    position = 0
+
+    for line in text.splitlines(keepends=True):
+        line_start = position
+        position += len(line)
+        line_end = line_start + len(line.rstrip('\r\n'))
+
+        if fence_start is not None:
+            if _FENCE_RE.match(line):
+                blocks.append(('code', fence_start, line_end))
+                fence_start = None
+            continue
+
+        blank = not line.strip()
+        if prose_start is not None and (blank or not line[:1].isspace() and
+                                        (_FENCE_RE.match(line) or _HEADING_RE.match(line) or
+                                         _LIST_ITEM_RE.match(line) or _OTHER_BLOCK_RE.match(line))):
+            blocks.append(('prose', prose_start, prose_end))
+            prose_start = None
+        if item is not None and (blank or not line[:1].isspace() or _LIST_ITEM_RE.match(line)):
+            blocks.append(item)
+            item = None
+
+        if blank:
+            continue
+        if _FENCE_RE.match(line):
+            fence_start = line_start
+        elif item is not None:
+            # Indented continuation of the current list item
+            item = ('list', item[1], line_end)
+        elif prose_start is not None:
+            prose_end = line_end
+        elif _HEADING_RE.match(line):
+            blocks.append(('heading', line_start, line_end))
+        elif _LIST_ITEM_RE.match(line):
+            item = ('list', line_start, line_end)
+        elif _OTHER_BLOCK_RE.match(line):
+            blocks.append(('other', line_start, line_end))
+        else:
+            prose_start, prose_end = line_start, line_end
+
+    if fence_start is not None:
+        blocks.append(('code', fence_start, len(text)))
+    if prose_start is not None:
+        blocks.append(('prose', prose_start, prose_end))
+    if item is not None:
+        blocks.append(item)
+
+    return blocks
+
+def _humanize_prose(prose, api_key):
+    # HIX drops markdown emphasis, so send the plain words and re-apply bold
+    # to as many occurrences of each phrase as were bold before
+    bold_counts = Counter(phrase.lower() for phrase in _BOLD_RE.findall(prose))
+    plain = _BOLD_RE.sub(r'\1', prose)
+    humanized, source = upstream_flight.do(flight_key('hix', plain), lambda: _humanize_chunk(plain, api_key))
+    for phrase, count in bold_counts.items():
+        humanized = re.sub(r'(?<!\*)(' + re.escape(phrase) + r')(?!\*)', r'**\1**',
+                           humanized, count=count, flags=re.IGNORECASE)
+    return humanized, source
+
+def humanize_text(text, max_words=500, min_words=HUMANIZE_MIN_BLOCK_WORDS, report=None, api_key=None):
     """
-    Humanize text by processing it in chunks while preserving paragraph structure.
+    Humanize the prose of a markdown document while preserving its structure.
+
+    Headings, code, tables and list markers are never sent to HIX. Prose
+    blocks (and list item bodies) below min_words are left as they are; the
+    rest are cut into balanced chunks, humanized in parallel and spliced back
+    in place. While the HIX circuit breaker is open, chunks are rewritten by
+    Gemini instead (or left as they are, depending on HIX_FALLBACK).
    
     Args:
         text (str): Text to be humanized
         max_words (int): Maximum words per chunk
+        min_words (int): Minimum words for a block to be worth a HIX request
+        report (dict): Optional dict that receives chunk counts per source
+        api_key (str): HIX API key, defaults to HIX_API_KEY
    
     Returns:
         str: Humanized text with preserved formatting
+
+    Raises:
+        CircuitOpenError: If HIX is unavailable and HIX_FALLBACK is 'none'
     """
     # Validate input
     if not text or len(text.split()) < 50:
         return text
  
-    # Get API key from environment
-    api_key = "71b72a19738541f28fbe02460335e12c"
+    api_key = api_key or HIX_API_KEY
     if not api_key:
         print("Error: HIX API Key not set in environment variables")
         return text
    
-    # Split text into paragraphs first
-    paragraphs = text.split('\n\n')
-    humanized_paragraphs = []
-   
-    for paragraph in paragraphs:
-        if not paragraph.strip():
-            humanized_paragraphs.append('')
+    # Collect the (start, end) spans of prose worth humanizing
+    spans = []
+    for kind, start, end in parse_markdown_blocks(text):
+        if kind == 'list':
+            start += _LIST_ITEM_RE.match(text, start).end() - start
+        elif kind != 'prose':
             continue
-           
-        # Split paragraph into chunks if it's too long
-        chunks = split_text_into_chunks(paragraph, max_words)
-       
-        # Humanize each chunk
-        humanized_chunks = []
-        for chunk in chunks:
-            humanized_chunk = humanize_chunk(chunk, api_key)
-            humanized_chunks.append(humanized_chunk)
-       
-        # Join the chunks of this paragraph
-        humanized_paragraph = ' '.join(humanized_chunks)
-        humanized_paragraphs.append(humanized_paragraph)
-   
-    # Reassemble humanized paragraphs with proper spacing
-    return '\n\n'.join(humanized_paragraphs)
+        if len(text[start:end].split()) < min_words:
+            continue
+        spans.extend((start + chunk_start, start + chunk_end)
+                     for chunk_start, chunk_end in chunk_spans(text[start:end], max_words))
+
+    if not spans:
+        return text
+
+    if HIX_FALLBACK == 'none' and hix_breaker.state == 'open' and hix_breaker.retry_after() > 0:
+        raise CircuitOpenError("HIX humanizer is unavailable", hix_breaker.retry_after())
+
+    with ThreadPoolExecutor(max_workers=HIX_CONCURRENCY) as executor:
+        results = list(executor.map(in_request_scope(lambda span: _humanize_prose(text[span[0]:span[1]], api_key)), spans))
+    if report is not None:
+        for _, source in results:
+            report[source] = report.get(source, 0) + 1
+
+    # Splice the humanized chunks back between the untouched markdown
+    parts = []
+    position = 0
+    for (start, end), (humanized, _) in zip(spans, results):
+        parts.append(text[position:start])
+        parts.append(humanized)
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+# Per-blog token and call budgets. Token counts are estimated locally
+# (~4 characters per token) before every call and reconciled against the
+# usage metadata Gemini returns afterwards.
+BLOG_TARGET_WORDS = int(os.getenv('BLOG_TARGET_WORDS', 1200))
+BLOG_TOKEN_BUDGET = int(os.getenv('BLOG_TOKEN_BUDGET', 60000))
+BLOG_CALL_BUDGET = int(os.getenv('BLOG_CALL_BUDGET', 12))
+MIN_SECTION_WORDS = int(os.getenv('MIN_SECTION_WORDS', 200))
+PREVIOUS_CONTEXT_TOKENS = int(os.getenv('PREVIOUS_CONTEXT_TOKENS', 1500))
+
+# A top-level outline entry: "## Heading", "I. Intro", "1. Intro", "**2. Overview**"
+_OUTLINE_TOP_RE = re.compile(r'#{1,4}[ \t]+\S|(?:\*\*)?(?:[IVXLC]+|\d+)[.)][ \t]+\S')
+
+class BudgetExceededError(RuntimeError):
+    pass
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4 if text else 0
+
+def words_to_tokens(words):
+    return int(words * 4 / 3)
+
+def tail_tokens(text, max_tokens):
+    """Keep roughly the last max_tokens tokens of text, cut on a word boundary."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    tail = text[-max_chars:]
+    return tail[tail.find(' ') + 1:]
+
+class TokenBudget:
+    """Token and call allowance for generating one blog."""
+
+    def __init__(self, max_tokens=BLOG_TOKEN_BUDGET, max_calls=BLOG_CALL_BUDGET):
+        self.max_tokens = max_tokens
+        self.max_calls = max_calls
+        self.used_tokens = 0
+        self.calls = 0
+        self.predicted_tokens = 0
+
+    def remaining_calls(self):
+        return self.max_calls - self.calls
+
+    def allows(self, predicted_tokens, calls=1):
+        return (self.calls + calls <= self.max_calls and
+                self.used_tokens + predicted_tokens <= self.max_tokens)
+
+    def record(self, stage, predicted_tokens, response):
+        usage = getattr(response, 'usage_metadata', None)
+        actual_tokens = getattr(usage, 'total_token_count', 0) or predicted_tokens
+        self.calls += 1
+        self.used_tokens += actual_tokens
+        self.predicted_tokens += predicted_tokens
+        print(f"Token usage [{stage}]: predicted {predicted_tokens}, actual {actual_tokens} "
+              f"({self.used_tokens}/{self.max_tokens} tokens, {self.calls}/{self.max_calls} calls)")
+
+# Largest answer the Gemini flash models produce
+MAX_OUTPUT_TOKENS = 8192
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """
+    Generation settings of one pipeline stage.
+
+    max_output_tokens is derived from the word count each call expects, with
+    `headroom` to spare so answers aren't cut mid-sentence; whole-blog
+    rewrites get more since truncating them would lose content.
+    max_output_words can only lower that word count, never raise it.
+    """
+    temperature: float = None
+    top_p: float = None
+    headroom: float = 1.4
+    min_output_tokens: int = 256
+    max_output_words: int = None
+    stop_sequences: tuple = ()
+    response_schema: dict = None
+
+    def config(self, output_words=0):
+        config = {}
+        words = min(filter(None, (self.max_output_words, output_words)), default=0)
+        if words:
+            config['max_output_tokens'] = min(max(self.min_output_tokens, int(words_to_tokens(words) * self.headroom)),
+                                              MAX_OUTPUT_TOKENS)
+        if self.temperature is not None:
+            config['temperature'] = self.temperature
+        if self.top_p is not None:
+            config['top_p'] = self.top_p
+        if self.stop_sequences:
+            config['stop_sequences'] = list(self.stop_sequences)
+        if self.response_schema is not None:
+            config['response_mime_type'] = 'application/json'
+            config['response_schema'] = self.response_schema
+        return config
+
+FAQ_SCHEMA = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {'question': {'type': 'STRING'}, 'answer': {'type': 'STRING'}},
+        'required': ['question', 'answer'],
+    },
+}
+
+STAGE_PROFILES = {
+    'outline': GenerationProfile(temperature=0.7, headroom=2.5),
+    'section': GenerationProfile(temperature=0.8, stop_sequences=('<!-- section:',)),
+    'keyword_verification': GenerationProfile(temperature=0.3, headroom=2.0),
+    'grammar': GenerationProfile(temperature=0.2, headroom=2.0),
+    'summary': GenerationProfile(temperature=0.5, headroom=1.3),
+    'faq': GenerationProfile(temperature=0.6, headroom=1.5, response_schema=FAQ_SCHEMA),
+    'humanize': GenerationProfile(temperature=0.9, headroom=1.6),
+    'adapt': GenerationProfile(temperature=0.4, headroom=2.0),
+}
+
+# Per-request overrides, sent as a "generation" field (JSON object, or a JSON
+# string in form posts) keyed by stage, e.g.
+# {"section": {"temperature": 0.5, "max_output_words": 300}}
+GENERATION_OVERRIDE_FIELDS = {'temperature': float, 'top_p': float, 'max_output_words': int, 'stop_sequences': tuple}
+# Values outside these ranges are clamped to them
+GENERATION_OVERRIDE_BOUNDS = {'temperature': (0.0, 2.0), 'top_p': (0.0, 1.0),
+                              'max_output_words': (1, MAX_OUTPUT_TOKENS * 3 // 4)}
+
+_generation_local = threading.local()
+
+def parse_generation_overrides(raw):
+    """
+    Validate per-request overrides, clamping numbers to
+    GENERATION_OVERRIDE_BOUNDS.
 
-def improve_grammar_and_readability(content, primary_keywords, secondary_keywords):
+    Returns:
+        dict: {stage: {field: value}}
+
+    Raises:
+        ValueError: On unknown stages or fields and bad values
+    """
+    if isinstance(raw, str):
+        raw = json.loads(raw) if raw.strip() else {}
+    if not isinstance(raw, dict):
+        raise ValueError("generation overrides must be an object keyed by stage")
+    overrides = {}
+    for stage, fields in raw.items():
+        if stage not in STAGE_PROFILES or not isinstance(fields, dict):
+            raise ValueError(f"Unknown generation stage: {stage}")
+        overrides[stage] = {}
+        for name, value in fields.items():
+            if name not in GENERATION_OVERRIDE_FIELDS:
+                raise ValueError(f"Unknown generation setting for {stage}: {name}")
+            if name == 'stop_sequences':
+                if not isinstance(value, list) or not all(isinstance(item, str) for item in value) or len(value) > 5:
+                    raise ValueError("stop_sequences must be a list of up to 5 strings")
+            if name in GENERATION_OVERRIDE_BOUNDS:
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                    raise ValueError(f"{name} must be a number")
+                low, high = GENERATION_OVERRIDE_BOUNDS[name]
+                value = min(max(value, low), high)
+            overrides[stage][name] = GENERATION_OVERRIDE_FIELDS[name](value)
+    return overrides
+
+def current_generation_overrides():
+    return getattr(_generation_local, 'overrides', None) or {}
+
+def generation_config(stage, output_words=0):
+    """generation_config for a call of `stage`, with this request's overrides applied."""
+    profile = STAGE_PROFILES.get(stage, GenerationProfile())
+    override = current_generation_overrides().get(stage)
+    if override:
+        profile = replace(profile, **override)
+    return profile.config(output_words)
+
+def in_request_scope(func):
+    """Wrap func so pool threads run it with the calling request's lane and overrides."""
+    lane, sid = current_priority()
+    overrides = current_generation_overrides()
+
+    def wrapper(*args, **kwargs):
+        previous = getattr(_generation_local, 'overrides', None)
+        _generation_local.overrides = overrides
+        try:
+            with priority(lane, sid):
+                return func(*args, **kwargs)
+        finally:
+            _generation_local.overrides = previous
+    return wrapper
+
+@app.before_request
+def load_generation_overrides():
+    _generation_local.overrides = None
+    raw = request.form.get('generation') if request.form else None
+    if raw is None:
+        payload = request.get_json(silent=True) if request.is_json else None
+        raw = payload.get('generation') if isinstance(payload, dict) else None
+    if raw:
+        try:
+            _generation_local.overrides = parse_generation_overrides(raw)
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': f"Invalid generation overrides: {e}"}), 400
+
+# Admission control for the full generation pipelines. A pipeline is only
+# started if its estimated run time, from the smoothed per-stage latencies
+# and the number of pipelines sharing the generation lane, fits within
+# PIPELINE_DEADLINE_SECONDS (kept under gunicorn's 120 s timeout). Otherwise
+# the optional whole-blog passes are dropped in DOWNGRADE_STAGES order, and
+# if it still doesn't fit the request is shed with a 503. The defaults are
+# typical flash-tier latencies, so an idle worker runs every pass and only
+# queueing or slow (or timing out) upstream calls trigger a downgrade.
+PIPELINE_DEADLINE_SECONDS = float(os.getenv('PIPELINE_DEADLINE_SECONDS', 110))
+MAX_IN_FLIGHT_PIPELINES = int(os.getenv('MAX_IN_FLIGHT_PIPELINES', 12))
+STAGE_LATENCY_DEFAULTS = {'outline': 5.0, 'section': 6.0, 'keyword_verification': 12.0,
+                          'grammar': 12.0, 'summary': 3.0, 'faq': 8.0, 'humanize': 6.0, 'adapt': 15.0}
+DOWNGRADE_STAGES = ('grammar', 'keyword_verification')
+PIPELINE_STAGES = {
+    'product': ('outline', 'section', 'grammar', 'summary'),
+    'general': ('outline', 'section', 'keyword_verification', 'grammar', 'summary'),
+    'seeded': ('adapt',),
+}
+
+class OverloadedError(RuntimeError):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class StageLatency:
+    """Exponentially weighted upstream latency of each pipeline stage."""
+
+    def __init__(self, defaults=STAGE_LATENCY_DEFAULTS, alpha=0.3):
+        self.alpha = alpha
+        self.latency = dict(defaults)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            previous = self.latency.get(stage)
+            self.latency[stage] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def estimate(self, stage):
+        return self.latency.get(stage, 0.0)
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: round(seconds, 2) for stage, seconds in self.latency.items()}
+
+stage_latency = StageLatency()
+
+class AdmissionController:
+    """Admit, downgrade or shed pipelines against their deadline."""
+
+    def __init__(self, deadline=PIPELINE_DEADLINE_SECONDS, max_in_flight=MAX_IN_FLIGHT_PIPELINES,
+                 latency=None, scheduler=None):
+        self.deadline = deadline
+        self.max_in_flight = max_in_flight
+        self.latency = latency
+        self.scheduler = scheduler
+        self.in_flight = 0
+        self.admitted = 0
+        self.downgraded = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def _lanes(self):
+        # Upstream slots pipelines can use: everything not reserved for other lanes
+        scheduler = self.scheduler or upstream_scheduler
+        return max(1, scheduler.capacity - sum(n for lane, n in scheduler.reserved.items() if lane != 'generation'))
+
+    def estimate(self, kind, skip=(), in_flight=None):
+        latency = self.latency or stage_latency
+        stages = PIPELINE_STAGES[kind]
+        # As many section calls as plan_outline allows, with the closing passes
+        # reserved, plus the one reduce_redundancy may make
+        closing = len([stage for stage in stages if stage not in ('outline', 'section')])
+        sections = planned_section_count(budget=TokenBudget(), reserved_calls=closing) + 1
+        base = sum(latency.estimate(stage) * (sections if stage == 'section' else 1)
+                   for stage in stages if stage not in skip)
+        in_flight = self.in_flight if in_flight is None else in_flight
+        return base * max(1.0, (in_flight + 1) / self._lanes())
+
+    def admit(self, kind):
+        """
+        Reserve a pipeline slot.
+
+        Returns:
+            tuple: Stages to skip to meet the deadline (empty when none)
+
+        Raises:
+            OverloadedError: If the pipeline can't finish in time even downgraded
+        """
+        with self._lock:
+            skip = ()
+            estimate = self.estimate(kind)
+            for stage in DOWNGRADE_STAGES:
+                if estimate <= self.deadline:
+                    break
+                if stage in PIPELINE_STAGES[kind]:
+                    skip += (stage,)
+                    estimate = self.estimate(kind, skip)
+            if estimate > self.deadline or self.in_flight >= self.max_in_flight:
+                self.shed += 1
+                retry_after = min(self.deadline, max(1.0, estimate - self.deadline))
+                raise OverloadedError(f"Server busy: estimated {estimate:.0f}s for this blog exceeds the "
+                                      f"{self.deadline:.0f}s limit, please retry shortly", retry_after)
+            self.in_flight += 1
+            self.admitted += 1
+            self.downgraded += bool(skip)
+            return skip
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'in_flight': self.in_flight, 'admitted': self.admitted, 'downgraded': self.downgraded,
+                    'shed': self.shed, 'deadline': self.deadline,
+                    'estimate': {kind: round(self.estimate(kind), 1) for kind in PIPELINE_STAGES}}
+
+admission = AdmissionController()
+
+def generate_text(prompt, stage, budget=None, output_words=0, label=None, context=None):
+    """
+    Run a single Gemini call, enforcing the blog's budget when one is given.
+
+    Args:
+        prompt (str): Prompt to send
+        stage (str): Pipeline stage, a key of STAGE_TIERS used for routing
+        budget (TokenBudget): Optional per-blog budget
+        output_words (int): Expected length of the answer in words
+        label (str): Name for logging, defaults to the stage
+        context (BlogContext): Shared blog context the prompt builds on
+
+    Returns:
+        str: Generated text
+
+    Raises:
+        BudgetExceededError: If the call would overrun the budget
+    """
+    label = label or stage
+    predicted_tokens = estimate_tokens(prompt) + words_to_tokens(output_words)
+    if context is not None:
+        predicted_tokens += estimate_tokens(context.prefix)
+    if budget is not None and not budget.allows(predicted_tokens):
+        raise BudgetExceededError(f"Token budget exhausted before {label} "
+                                  f"({budget.used_tokens}/{budget.max_tokens} tokens, "
+                                  f"{budget.calls}/{budget.max_calls} calls)")
+    config = generation_config(stage, output_words)
+
+    def call():
+        with upstream_scheduler.slot():
+            started = time.monotonic()
+            try:
+                return model_router.generate(prompt, stage, context, config)
+            finally:
+                # Failures count too: a call that timed out took at least this long
+                stage_latency.record(stage, time.monotonic() - started)
+
+    with profile_stage(stage):
+        response = upstream_flight.do(flight_key(stage, prompt, context.prefix if context else None, config), call)
+    if budget is not None:
+        budget.record(label, predicted_tokens, response)
+    return response.text
+
+def _merge_smallest_pair(sections):
+    sizes = [len(section.split()) for section in sections]
+    i = min(range(len(sections) - 1), key=lambda j: sizes[j] + sizes[j + 1])
+    sections[i:i + 2] = [sections[i] + '\n\n' + sections[i + 1]]
+
+def parse_outline_sections(outline, max_sections=None, min_words=8):
+    """
+    Split an outline into its real top-level sections.
+
+    Top-level entries are numbered or headed lines; everything below one
+    (bullets, indented sub-points) belongs to it. Fragments shorter than
+    min_words, and single-line title or preamble fragments ahead of the
+    first section with content, are merged into their neighbour; adjacent
+    sections are then merged until at most max_sections remain.
+
+    Args:
+        outline (str): Outline text returned by the model
+        max_sections (int): Optional upper bound on the number of sections
+        min_words (int): Sections shorter than this are merged
+
+    Returns:
+        list: Section outline strings
+    """
+    sections = []
+    current = []
+    for line in outline.strip().splitlines():
+        if _OUTLINE_TOP_RE.match(line) and current:
+            sections.append('\n'.join(current).strip())
+            current = []
+        current.append(line)
+    if current:
+        sections.append('\n'.join(current).strip())
+
+    if len(sections) < 2:
+        sections = [section.strip() for section in outline.split('\n\n') if section.strip()]
+
+    merged = []
+    carry = ''
+    for i, section in enumerate(sections):
+        # A lone title line ("## Blog Outline: ...") is no section however
+        # long it is, as long as real sections with content follow
+        title_only = (not merged and '\n' not in section and i + 1 < len(sections)
+                      and '\n' in sections[i + 1])
+        section = f"{carry}\n\n{section}" if carry else section
+        if title_only or len(section.split()) < min_words:
+            carry = section
+        else:
+            merged.append(section)
+            carry = ''
+    if carry:
+        if merged:
+            merged[-1] += '\n\n' + carry
+        else:
+            merged.append(carry)
+
+    while max_sections and len(merged) > max(max_sections, 1):
+        _merge_smallest_pair(merged)
+    return merged
+
+_OUTLINE_MARKUP_RE = re.compile(r'^(?:#{1,6}[ \t]*|[-*+][ \t]+|\*\*)+|[*:]+$')
+
+def _outline_text(line):
+    # Unwrap **bold** runs anywhere in the line, then strip heading and bullet markup
+    return _OUTLINE_MARKUP_RE.sub('', _BOLD_RE.sub(r'\1', line.strip())).strip()
+
+@dataclass
+class OutlineSection:
+    """One top-level outline section with its (possibly nested) sub-points."""
+    id: str
+    title: str
+    points: list = field(default_factory=list)  # [point_id, depth, text]
+
+    def render(self):
+        lines = [self.title]
+        lines.extend(f"{'  ' * depth}- {text}" for _, depth, text in self.points)
+        return '\n'.join(lines)
+
+class Outline:
+    """
+    Parsed blog outline addressable by stable section and point IDs.
+
+    Sections are numbered s1, s2, ... and their sub-points s1.1, s1.2, ...
+    The compact JSON form is what gets cached per session.
+    """
+
+    def __init__(self, sections):
+        self.sections = sections
+        self._by_id = {section.id: section for section in sections}
+
+    def __len__(self):
+        return len(self.sections)
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def section(self, section_id):
+        return self._by_id[section_id]
+
+    def index(self, section_id):
+        return self.sections.index(self._by_id[section_id])
+
+    @classmethod
+    def parse(cls, text, max_sections=None):
+        sections = []
+        for number, section_text in enumerate(parse_outline_sections(text, max_sections), start=1):
+            section_id = f"s{number}"
+            lines = [line for line in section_text.splitlines() if line.strip()]
+            # A merged-in preamble ("## Blog Outline: ...") precedes the real
+            # section heading; the last of the leading headings is the title
+            title_line = 0
+            while title_line + 1 < len(lines) and _OUTLINE_TOP_RE.match(lines[title_line + 1]):
+                title_line += 1
+            title = _outline_text(lines[title_line])
+            point_lines = lines[:title_line] + lines[title_line + 1:]
+            # Sub-point depth follows the indentation levels actually used,
+            # whether the model indents by 2 or 4 spaces
+            indents = sorted({len(line) - len(line.lstrip()) for line in point_lines
+                              if not _OUTLINE_TOP_RE.match(line)})
+            points = []
+            for line in point_lines:
+                indent = len(line) - len(line.lstrip())
+                depth = 0 if _OUTLINE_TOP_RE.match(line) else indents.index(indent) + 1
+                point = _outline_text(line)
+                if point:
+                    points.append([f"{section_id}.{len(points) + 1}", depth, point])
+            sections.append(OutlineSection(section_id, title, points))
+        return cls(sections)
+
+    def to_json(self):
+        return json.dumps({'v': 1, 's': [[s.id, s.title, s.points] for s in self.sections]},
+                          separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, data):
+        return cls([OutlineSection(section_id, title, points)
+                    for section_id, title, points in json.loads(data)['s']])
+
+class SessionStore:
+    """Small thread-safe LRU map for per-session state kept in this worker."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller runs the function; callers arriving while it is in
+    flight wait for it and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+# Whole route computations (double-clicked buttons) and individual Gemini /
+# HIX calls are coalesced separately
+request_flight = SingleFlight()
+upstream_flight = SingleFlight()
+
+def flight_key(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+def session_flight_key(route, *parts):
+    return flight_key(route, session_id(), current_generation_overrides(), *parts)
+
+SESSION_STORE_SIZE = int(os.getenv('SESSION_STORE_SIZE', os.getenv('OUTLINE_CACHE_SIZE', 256)))
+_outline_store = SessionStore(SESSION_STORE_SIZE)
+# Generated sections, summary and keyword counts, keyed like the outline
+_blog_store = SessionStore(SESSION_STORE_SIZE)
+
+def cache_outline(outline):
+    """Store an outline's compact form and return the key to keep in the session."""
+    outline_id = uuid.uuid4().hex
+    _outline_store.put(outline_id, outline.to_json())
+    return outline_id
+
+def get_cached_outline(outline_id):
+    data = _outline_store.get(outline_id) if outline_id else None
+    return Outline.from_json(data) if data else None
+
+def plan_outline(outline, budget=None, target_words=BLOG_TARGET_WORDS, reserved_calls=2):
+    """
+    Parse an outline into as many sections as the blog should be generated in.
+
+    The outline's own top-level structure is kept when it fits; noisy outlines
+    are merged down so that no section is shorter than MIN_SECTION_WORDS and
+    the section calls, plus reserved_calls for the closing passes, fit the
+    call budget. Already parsed outlines are returned unchanged.
+
+    Returns:
+        Outline: The planned outline
+    """
+    if isinstance(outline, Outline):
+        return outline
+    return Outline.parse(outline, planned_section_count(target_words, budget, reserved_calls))
+
+def planned_section_count(target_words=BLOG_TARGET_WORDS, budget=None, reserved_calls=2):
+    """The most sections plan_outline splits a blog into."""
+    max_sections = max(target_words // MIN_SECTION_WORDS, 1)
+    if budget is not None:
+        max_sections = max(min(max_sections, budget.remaining_calls() - reserved_calls), 1)
+    return max_sections
+
+def plan_keywords(outline, primary_kw_list, secondary_kw_list):
+    """
+    Decide which sections each keyword should appear in.
+
+    Returns:
+        dict: {"primary": {keyword: [section_id, ...]}, "secondary": {...}}
+    """
+    ids = [section.id for section in outline]
+    keyword_plan = {
+        "primary": {},
+        "secondary": {}
+    }
+
+    # Plan primary keywords (aim for 3 uses per primary keyword)
+    for kw in primary_kw_list:
+        # Distribute across introduction, body, and conclusion
+        section_ids = [ids[0]]  # Always use in intro
+        if len(ids) > 2:
+            section_ids.append(ids[len(ids) // 2])  # Use in middle section
+        if len(ids) > 1:
+            section_ids.append(ids[-1])  # Use in conclusion
+        keyword_plan["primary"][kw] = section_ids
+
+    # Plan secondary keywords (aim for at least 1 use per secondary keyword)
+    for i, kw in enumerate(secondary_kw_list):
+        # Distribute evenly across all sections
+        if len(ids) > 2:
+            target_section = (i % (len(ids) - 2)) + 1  # Skip intro and conclusion
+        else:
+            target_section = i % len(ids)
+        keyword_plan["secondary"][kw] = [ids[target_section]]
+
+    return keyword_plan
+
+# Marker lines keep section boundaries recoverable through whole-blog passes
+_SECTION_MARKER_RE = re.compile(r'^[ \t]*<!--\s*section:(\w+)\s*-->[ \t]*(?:\n|$)', re.M)
+SECTION_MARKER_INSTRUCTION = "\n    - Keeping every <!-- section:... --> marker line exactly as it is, on its own line"
+
+def join_sections(section_texts):
+    return '\n\n'.join(f"<!-- section:{section_id} -->\n{text.strip()}" for section_id, text in section_texts.items())
+
+def split_sections(text, section_ids):
+    """
+    Recover per-section text from a blog joined with join_sections.
+
+    Returns:
+        dict: {section_id: text}, or None if the markers did not survive
+    """
+    markers = list(_SECTION_MARKER_RE.finditer(text))
+    if [marker.group(1) for marker in markers] != list(section_ids):
+        return None
+    ends = [marker.start() for marker in markers[1:]] + [len(text)]
+    return {marker.group(1): text[marker.end():end].strip() for marker, end in zip(markers, ends)}
+
+def strip_section_markers(text):
+    return _SECTION_MARKER_RE.sub('', text)
+
+def count_keywords(text, keywords):
+    lowered = text.lower()
+    return {keyword: lowered.count(keyword.lower()) for keyword in keywords if keyword}
+
+def improve_grammar_and_readability(content, primary_keywords, secondary_keywords, budget=None):
     improvement_prompt = f"""Please review and improve the following text.
     Focus on:
     - Make sure the primary keywords are used only 4-5 times in whole blog: {primary_keywords}
@@ -148,20 +1663,20 @@ def improve_grammar_and_readability(content, primary_keywords, secondary_keyword
     - Maintaining the original tone and meaning
     - Breaking up long sentences
     - Using more engaging and precise language
-    - Ensuring professional and conversational style
+    - Ensuring professional and conversational style{SECTION_MARKER_INSTRUCTION if '<!-- section:' in content else ''}
 
     Original Text:
     {content}
 
     Provide the improved version of the text."""
     try:
-        response = grammar_improvement_model.generate_content(improvement_prompt)
-        return response.text
+        return generate_text(improvement_prompt, 'grammar', budget,
+                             output_words=len(content.split()))
     except Exception as e:
         print(f"Grammar improvement error: {e}")
         return content
 
-def generate_blog_outline(product_url, product_title, product_description, primary_keywords, secondary_keywords, intent):
+def generate_blog_outline(product_url, product_title, product_description, primary_keywords, secondary_keywords, intent, budget=None):
     prompt = f"""Create a comprehensive and detailed blog outline for a product blog with the following details:
 
 Product URL: {product_url}
@@ -217,53 +1732,75 @@ Additional Guidance:
 - Highlight unique aspects of the product
 - Provide detailed sub-points under each main section to elaborate on the content
 """
-    response = blog_generation_model.generate_content(prompt)
-    return response.text
+    return generate_text(prompt, 'outline', budget, output_words=600)
+
+def _finish_sections(content, outline, section_texts):
+    # Recover per-section text for section-level regeneration. If a whole-blog
+    # pass dropped the markers, section_texts is left empty: the pre-pass
+    # drafts would undo that pass's edits once a section is regenerated.
+    ids = [section.id for section in outline]
+    sections = split_sections(content, ids)
+    if sections is None:
+        print("Section markers lost in post-processing; section regeneration disabled for this blog")
+        return strip_section_markers(content)
+    if section_texts is not None:
+        section_texts.update(sections)
+    return '\n\n'.join(sections.values())
+
+def product_blog_context(product_url, product_title, product_description, primary_keywords, secondary_keywords, intent):
+    return f"""You are writing a blog post about the following product.
+
+Product Details:
+- Product URL: {product_url}
+- Product Title: {product_title}
+- Product Description: {product_description}
+- Search Intent: {intent}
+
+Keyword Guidelines:
+- Use primary keywords sparingly and naturally, aiming for no more than 3 total uses across the entire blog: {', '.join(primary_keywords.split(", "))}. Ensure the usage is contextually relevant and not forced.
+- Use each of the following secondary keywords approximately **1 time** throughout the entire blog: {', '.join(secondary_keywords.split(", "))}. Make the usage natural and contextually relevant."""
+
+def general_blog_context(keywords, primary_keywords, prompt):
+    return f"""You are writing a blog post on the following topic.
+
+Topic Overview:
+{prompt}
 
-def generate_blog_content(outline, product_url, product_title, product_description, primary_keywords, secondary_keywords, intent):
-    sections = outline.split('\n\n')
+Primary Keywords: {primary_keywords}
+Secondary Keywords: {keywords}
+- DO NOT mention "keywords" or the process of keyword incorporation in the final text"""
+
+def generate_blog_content(outline, product_url, product_title, product_description, primary_keywords, secondary_keywords, intent, budget=None, section_texts=None, context=None, skip=()):
+    context = context or BlogContext(product_blog_context(product_url, product_title, product_description, primary_keywords, secondary_keywords, intent), cache=False)
+    outline = plan_outline(outline, budget)
+    section_words = BLOG_TARGET_WORDS // len(outline)
     blog_content = []
     all_keywords = primary_keywords.split(", ") + secondary_keywords.split(", ")
     keyword_usage = {keyword: 0 for keyword in all_keywords}
     primary_keyword_target = 3
     secondary_keyword_target = 1
 
-    for i, section in enumerate(sections):
-        previous_text = ' '.join(blog_content) if i > 0 else 'None'
-        primary_keywords_instruction = (
-            "\n- Use primary keywords sparingly and naturally, aiming for no more than 3 total uses across the entire blog: "
-            + ', '.join(primary_keywords.split(", ")) +
-            ". Ensure the usage is contextually relevant and not forced."
-        )
-        secondary_keywords_instruction = (
-            "\n- Use each of the following secondary keywords approximately **1 time** throughout the entire blog: "
-            + ', '.join(secondary_keywords.split(", ")) +
-            ". Make the usage natural and contextually relevant."
-        )
-        section_prompt = f"""Generate a detailed section for a blog post while ensuring no repetition.
+    for i, section in enumerate(outline):
+        previous_text = tail_tokens(' '.join(blog_content), PREVIOUS_CONTEXT_TOKENS) if i > 0 else 'None'
+        section_prompt = f"""Generate a detailed section for the blog post while ensuring no repetition.
 
 Section Outline:
-{section}
-
-Product Details:
-- Product URL: {product_url}
-- Product Title: {product_title}
-- Product Description: {product_description}
-- Search Intent: {intent}
+{section.render()}
 
 Guidelines:
-- Word count for this section: Approximately {1200 // len(sections)} words
+- Word count for this section: Approximately {section_words} words
 - Avoid repeating points from previous sections
 - Focus on new insights, examples, and fresh perspectives
 - Ensure smooth transitions from previous sections
-- Maintain a professional and engaging tone{primary_keywords_instruction}{secondary_keywords_instruction}
+- Maintain a professional and engaging tone
+- Follow the keyword guidelines above
 
 Previous Sections Summary:
 {previous_text}
 
 Generate the content for this section."""
-        response = blog_generation_model.generate_content(section_prompt)
-        section_content = response.text
+        section_content = generate_text(section_prompt, 'section', budget, output_words=section_words,
+                                        label=f'section {section.id}', context=context)
         for keyword in all_keywords:
             keyword_usage[keyword] += section_content.lower().count(keyword.lower())
         blog_content.append(section_content)
@@ -273,14 +1810,16 @@ Generate the content for this section."""
             blog_content = [section.replace(keyword, f"**{keyword}**", count - primary_keyword_target) for section in blog_content]
         elif keyword in secondary_keywords.split(", ") and count < secondary_keyword_target:
             additional_content = f"Moreover, {keyword} is an important aspect to consider."
-            blog_content.append(additional_content)
+            blog_content[-1] += '\n\n' + additional_content
             keyword_usage[keyword] += 1
 
-    final_content = '\n\n'.join(blog_content)
-    improved_content = improve_grammar_and_readability(final_content, primary_keywords, secondary_keywords)
-    return improved_content
+    final_content = join_sections({section.id: text for section, text in zip(outline, blog_content)})
+    if 'grammar' in skip:
+        return _finish_sections(final_content, outline, section_texts)
+    improved_content = improve_grammar_and_readability(final_content, primary_keywords, secondary_keywords, budget)
+    return _finish_sections(improved_content, outline, section_texts)
 
-def generate_general_blog_outline(keywords, primary_keywords, prompt):
+def generate_general_blog_outline(keywords, primary_keywords, prompt, budget=None):
     outline_prompt = f"""Create a comprehensive and detailed blog outline based on the following details:
  
 Keywords: {keywords}
@@ -331,50 +1870,29 @@ Additional Guidance:
 - Highlight unique aspects of the topic
 - Provide detailed sub-points under each main section to elaborate on the content
 """
-    response = blog_generation_model.generate_content(outline_prompt)
-    return response.text
+    return generate_text(outline_prompt, 'outline', budget, output_words=600)
  
-def generate_general_blog_content(outline, keywords, primary_keywords, prompt):
-    sections = outline.split('\n\n')
+def generate_general_blog_content(outline, keywords, primary_keywords, prompt, budget=None, section_texts=None, context=None, skip=()):
+    context = context or BlogContext(general_blog_context(keywords, primary_keywords, prompt), cache=False)
+    # Keep one call for keyword verification and one for the grammar pass
+    outline = plan_outline(outline, budget, reserved_calls=3)
+    section_words = BLOG_TARGET_WORDS // len(outline)
     blog_content = []
    
     # Parse keywords into lists
     primary_kw_list = [kw.strip() for kw in primary_keywords.split(",")]
     secondary_kw_list = [kw.strip() for kw in keywords.split(",")]
    
-    # Distribution planning for keywords
-    total_sections = len(sections)
-   
     # Create a plan for keyword distribution across sections
-    keyword_plan = {
-        "primary": {},
-        "secondary": {}
-    }
-   
-    # Plan primary keywords (aim for 3 uses per primary keyword)
-    for kw in primary_kw_list:
-        keyword_plan["primary"][kw] = []
-        # Distribute across introduction, body, and conclusion
-        section_indices = [0]  # Always use in intro
-        if len(sections) > 2:
-            section_indices.append(len(sections) // 2)  # Use in middle section
-        if len(sections) > 1:
-            section_indices.append(len(sections) - 1)  # Use in conclusion
-        keyword_plan["primary"][kw] = section_indices
-   
-    # Plan secondary keywords (aim for at least 1 use per secondary keyword)
-    for i, kw in enumerate(secondary_kw_list):
-        # Distribute evenly across all sections
-        target_section = (i % (total_sections - 2)) + 1  # Skip intro and conclusion
-        keyword_plan["secondary"][kw] = [target_section]
+    keyword_plan = plan_keywords(outline, primary_kw_list, secondary_kw_list)
  
     # Generate each section with specific keyword requirements
-    for i, section in enumerate(sections):
+    for i, section in enumerate(outline):
         # Determine which keywords should be used in this section
-        section_primary_kw = [kw for kw, sections in keyword_plan["primary"].items() if i in sections]
-        section_secondary_kw = [kw for kw, sections in keyword_plan["secondary"].items() if i in sections]
+        section_primary_kw = [kw for kw, section_ids in keyword_plan["primary"].items() if section.id in section_ids]
+        section_secondary_kw = [kw for kw, section_ids in keyword_plan["secondary"].items() if section.id in section_ids]
        
-        previous_text = ' '.join(blog_content) if i > 0 else 'None'
+        previous_text = tail_tokens(' '.join(blog_content), PREVIOUS_CONTEXT_TOKENS) if i > 0 else 'None'
  
         keyword_instructions = ""
         if section_primary_kw:
@@ -385,33 +1903,29 @@ def generate_general_blog_content(outline, keywords, primary_keywords, prompt):
         if not section_primary_kw and not section_secondary_kw:
             keyword_instructions = "\n- Focus on content quality without specific keyword requirements for this section."
  
-        section_prompt = f"""Generate a detailed section for a blog post that naturally incorporates the required keywords.
+        section_prompt = f"""Generate a detailed section for the blog post that naturally incorporates the required keywords.
  
 Section Outline:
-{section}
- 
-Topic Overview:
-{prompt}
+{section.render()}
  
 Guidelines:
-- Word count for this section: Approximately {1200 // len(sections)} words
+- Word count for this section: Approximately {section_words} words
 - Avoid repeating points from previous sections
 - Focus on new insights, examples, and fresh perspectives
 - Ensure smooth transitions from previous sections
 - Maintain a professional and engaging tone{keyword_instructions}
-- DO NOT mention "keywords" or the process of keyword incorporation in the final text
  
 Previous Sections Summary:
 {previous_text}
  
 Generate the content for this section."""
  
-        response = blog_generation_model.generate_content(section_prompt)
-        section_content = response.text
+        section_content = generate_text(section_prompt, 'section', budget, output_words=section_words,
+                                        label=f'section {section.id}', context=context)
         blog_content.append(section_content)
  
     # Combine content
-    final_content = '\n\n'.join(blog_content)
+    final_content = join_sections({section.id: text for section, text in zip(outline, blog_content)})
    
     # Verify keyword usage and add missing keywords if necessary
     keyword_verification_prompt = f"""Review and optimize the following blog content to ensure natural inclusion of all required keywords:
@@ -431,18 +1945,24 @@ Instructions:
 3. DO NOT add awkward sentences just to include keywords
 4. Maintain the flow, tone and quality of the content
 5. DO NOT mention "keywords" or the process of incorporating them in the final text
-6. Return the complete, revised blog content
+6. Keep every <!-- section:... --> marker line exactly as it is, on its own line
+7. Return the complete, revised blog content
  
 Return the optimized blog content:"""
  
-    optimized_response = blog_generation_model.generate_content(keyword_verification_prompt)
-    optimized_content = optimized_response.text
+    optimized_content = final_content
+    if 'keyword_verification' not in skip:
+        try:
+            optimized_content = generate_text(keyword_verification_prompt, 'keyword_verification', budget,
+                                              output_words=len(final_content.split()))
+        except BudgetExceededError as e:
+            print(f"Skipping keyword verification: {e}")
    
     # Apply any additional readability improvements
-    if 'improve_grammar_and_readability' in globals():
-        optimized_content = improve_grammar_and_readability(optimized_content, primary_keywords, keywords)
+    if 'grammar' not in skip:
+        optimized_content = improve_grammar_and_readability(optimized_content, primary_keywords, keywords, budget)
    
-    return optimized_content
+    return _finish_sections(optimized_content, outline, section_texts)
  
  
 # def generate_general_blog_outline(keywords, primary_keywords, prompt):
@@ -553,7 +2073,7 @@ Return the optimized blog content:"""
 #     improved_content = improve_grammar_and_readability(final_content, primary_keywords, keywords)
 #     return improved_content
 
-def generate_blog_summary(blog_content, primary_keywords, secondary_keywords, intent):
+def generate_blog_summary(blog_content, primary_keywords, secondary_keywords, intent, budget=None, context=None):
     summary_prompt = f"""Generate a concise and engaging summary (150-200 words) of the following blog content. 
     Focus on:
     - Highlighting the main points and key takeaways
@@ -568,31 +2088,706 @@ def generate_blog_summary(blog_content, primary_keywords, secondary_keywords, in
 
     Provide the summary."""
     try:
-        response = blog_generation_model.generate_content(summary_prompt)
-        return response.text
+        return generate_text(summary_prompt, 'summary', budget, output_words=200, context=context)
     except Exception as e:
         print(f"Summary generation error: {e}")
         return "Unable to generate summary due to an error."
 
-def generate_faq_content(blog_content, faq_count=5):
-    faq_prompt = f"""Generate {faq_count} frequently asked questions (FAQs) based on the following blog content. 
+# FAQ requests above FAQ_SHARD_SIZE questions are split into parallel calls,
+# each over a different part of the blog. Shards ask for FAQ_OVERGENERATE
+# times their share so questions dropped as near-duplicates (word overlap of
+# FAQ_DUPLICATE_THRESHOLD or more) can be made up from the other shards.
+FAQ_MAX_COUNT = 50
+FAQ_ERROR = "Unable to generate FAQs due to an error."
+FAQ_SHARD_SIZE = int(os.getenv('FAQ_SHARD_SIZE', 8))
+FAQ_CONCURRENCY = int(os.getenv('FAQ_CONCURRENCY', 4))
+FAQ_OVERGENERATE = 1.3
+FAQ_DUPLICATE_THRESHOLD = 0.6
+
+_FAQ_ITEM_RE = re.compile(r'^[ \t]*(\*\*)?\d+[.)][ \t]*', re.M)
+_FAQ_STOPWORDS = frozenset('a an and are can do does for how i in is it of on or the to what when where which who why with you your'.split())
+
+def _faq_prompt(faq_count, blog_content, topics=None):
+    focus = ""
+    if topics:
+        focus = f"""
+    - Focus on the part of the blog below; the full blog also covers: {topics}"""
+    return f"""Generate {faq_count} frequently asked questions (FAQs) based on the following blog content. 
     Ensure the FAQs:
     - Are directly relevant to the content provided
     - Address common reader queries or potential confusion points
     - Are concise, clear, and engaging
     - Include both the question and a brief answer (2-3 sentences)
-    - Are formatted as a numbered list (e.g., 1. Question: ... Answer: ...)
+    - Are returned as a JSON array of objects with "question" and "answer" fields{focus}
 
     Blog Content:
     {blog_content}
 
     Provide the FAQs."""
+
+def split_blog_parts(blog_content, parts):
+    """
+    Split a blog at its headings into at most `parts` contiguous pieces of
+    similar length. Where headings are too few or too unevenly spread for
+    that, the blog is split between paragraphs instead, or between sentences
+    if there are too few paragraphs as well.
+
+    Returns:
+        list: (headings, text) tuples, headings being the piece's heading lines
+    """
+    text = strip_section_markers(blog_content)
+    blocks = parse_markdown_blocks(text)
+    total_words = len(text.split())
+    starts = [start for kind, start, _ in blocks if kind == 'heading']
+    longest = max((len(text[start:end].split()) for start, end in zip([0] + starts, starts + [len(text)])), default=0)
+    if len(starts) < parts or longest > 2 * total_words / max(1, parts):
+        starts = [start for _, start, _ in blocks]
+    if len(starts) < parts:
+        starts = [start for start, _ in chunk_spans(text, max(1, -(-total_words // parts)))]
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+    bounds = list(zip(starts, starts[1:] + [len(text)]))
+    sizes = [len(text[start:end].split()) for start, end in bounds]
+    target = sum(sizes) / max(1, parts)
+
+    pieces = []
+    current = []
+    filled = 0
+    for (start, end), size in zip(bounds, sizes):
+        current.append((start, end))
+        filled += size
+        if filled >= target * (len(pieces) + 1) and len(pieces) < parts - 1:
+            pieces.append(current)
+            current = []
+    if current:
+        pieces.append(current)
+
+    result = []
+    for piece in pieces:
+        piece_text = text[piece[0][0]:piece[-1][1]].strip()
+        headings = [_outline_text(text[start:end].split('\n', 1)[0])
+                    for start, end in piece if _HEADING_RE.match(text[start:end])]
+        if piece_text:
+            result.append((headings, piece_text))
+    return result
+
+def parse_faq_items(text):
+    """Split a numbered FAQ list into item bodies with their numbering removed."""
+    matches = list(_FAQ_ITEM_RE.finditer(text))
+    ends = [match.start() for match in matches[1:]] + [len(text)]
+    return [((match.group(1) or ''), text[match.end():end].strip()) for match, end in zip(matches, ends)]
+
+def _faq_question_words(body):
+    question = re.split(r'\bAnswer\b|\n', body, maxsplit=1)[0]
+    question = re.sub(r'^\W*Question\W*', '', question, flags=re.I)
+    return frozenset(word for word in re.findall(r'[a-z0-9]+', question.lower()) if word not in _FAQ_STOPWORDS)
+
+def merge_faq_lists(faq_lists, faq_count, threshold=FAQ_DUPLICATE_THRESHOLD):
+    """
+    Interleave several numbered FAQ lists, drop near-duplicate questions and
+    renumber the first `faq_count` into one list.
+    """
+    item_lists = [parse_faq_items(text) for text in faq_lists]
+    kept = []
+    seen = []
+    for round_items in zip_longest(*item_lists):
+        for item in round_items:
+            if item is None:
+                continue
+            words = _faq_question_words(item[1])
+            if any(words and other and len(words & other) / len(words | other) >= threshold for other in seen):
+                continue
+            seen.append(words)
+            kept.append(item)
+    return '\n\n'.join(f"{bold}{number}. {body}" for number, (bold, body) in enumerate(kept[:faq_count], 1))
+
+def format_faq(text):
+    """
+    Render FAQ_SCHEMA JSON output as the numbered list.
+
+    Raises:
+        ValueError: If the output isn't a JSON list, e.g. when it was cut off
+            at max_output_tokens
+    """
+    items = json.loads(text)
+    if not isinstance(items, list):
+        raise ValueError("FAQ output is not a JSON list")
+    return '\n\n'.join(f"{number}. Question: {item.get('question', '').strip()}\nAnswer: {item.get('answer', '').strip()}"
+                        for number, item in enumerate((item for item in items if isinstance(item, dict)), 1))
+
+def generate_faq_content(blog_content, faq_count=5, budget=None, context=None):
+    faq_count = max(1, min(int(faq_count), FAQ_MAX_COUNT))
+    shard_count = -(-faq_count // FAQ_SHARD_SIZE)
     try:
-        response = blog_generation_model.generate_content(faq_prompt)
-        return response.text
+        parts = split_blog_parts(blog_content, shard_count) if shard_count > 1 else []
+        if len(parts) < 2:
+            return format_faq(generate_text(_faq_prompt(faq_count, blog_content), 'faq', budget,
+                                            output_words=faq_count * 60, context=context))
+
+        shares = [faq_count // len(parts) + (i < faq_count % len(parts)) for i in range(len(parts))]
+        all_headings = [heading for headings, _ in parts for heading in headings]
+
+        def generate_shard(i):
+            ask = math.ceil(shares[i] * FAQ_OVERGENERATE)
+            headings, text = parts[i]
+            topics = ', '.join(heading for heading in all_headings if heading not in headings)
+            try:
+                return format_faq(generate_text(_faq_prompt(ask, text, topics), 'faq', budget,
+                                                output_words=ask * 60, label=f"faq {i + 1}/{len(parts)}",
+                                                context=context))
+            except Exception as e:
+                print(f"FAQ shard {i + 1} error: {e}")
+                return ""
+
+        with ThreadPoolExecutor(max_workers=FAQ_CONCURRENCY) as executor:
+            faq_lists = list(executor.map(in_request_scope(generate_shard), range(len(parts))))
+        merged = merge_faq_lists(faq_lists, faq_count)
+        if not merged:
+            raise RuntimeError("every FAQ shard failed")
+
+        missing = faq_count - len(parse_faq_items(merged))
+        if missing > 0:
+            # Too many duplicates: one short top-up call for the rest
+            prompt = _faq_prompt(missing, blog_content) + f"""
+    Do not repeat any of these questions:
+    {merged}"""
+            try:
+                extra = format_faq(generate_text(prompt, 'faq', budget, output_words=missing * 60,
+                                                 label="faq top-up", context=context))
+                merged = merge_faq_lists([merged + '\n\n' + extra], faq_count)
+            except Exception as e:
+                print(f"FAQ top-up error: {e}")
+        return merged
     except Exception as e:
         print(f"FAQ generation error: {e}")
-        return "Unable to generate FAQs due to an error."
+        return FAQ_ERROR
+
+SUMMARY_DELIMITER = "===SUMMARY==="
+
+def blog_keywords(form_data):
+    """Return the (primary, secondary) keyword lists of a stored blog request."""
+    if form_data.get('type') == 'product':
+        return form_data['primary_keywords'].split(", "), form_data['secondary_keywords'].split(", ")
+    return ([kw.strip() for kw in form_data['primary_keywords'].split(",")],
+            [kw.strip() for kw in form_data['keywords'].split(",")])
+
+def blog_details(form_data):
+    """Describe a blog request's product or topic for a prompt."""
+    if form_data.get('type') == 'product':
+        return f"""Product Details:
+- Product URL: {form_data['product_url']}
+- Product Title: {form_data['product_title']}
+- Product Description: {form_data['product_description']}
+- Search Intent: {form_data['intent']}"""
+    return f"""Topic Overview:
+{form_data['prompt']}"""
+
+def remember_blog(outline_id, section_texts, summary, form_data):
+    """Keep a generated blog's sections so single sections can be regenerated."""
+    primary_kw_list, secondary_kw_list = blog_keywords(form_data)
+    _blog_store.put(outline_id, {
+        'sections': dict(section_texts),
+        'summary': summary,
+        'keyword_usage': {section_id: count_keywords(text, primary_kw_list + secondary_kw_list)
+                          for section_id, text in section_texts.items()},
+    })
+
+def total_keyword_usage(keyword_usage, exclude=None):
+    totals = {}
+    for section_id, counts in keyword_usage.items():
+        if section_id == exclude:
+            continue
+        for keyword, count in counts.items():
+            totals[keyword] = totals.get(keyword, 0) + count
+    return totals
+
+def regenerate_section(outline, section_id, blog, form_data, budget=None, avoid=None):
+    """
+    Regenerate one section of a stored blog with a single Gemini call.
+
+    The neighbouring sections are sent as context, keyword instructions only
+    ask for what the rest of the blog is still missing, and the same call
+    returns the summary patched for the new section.
+
+    Args:
+        outline (Outline): The blog's outline
+        section_id (str): ID of the section to regenerate
+        blog (dict): Stored blog state from remember_blog
+        form_data (dict): The request the blog was generated from
+        budget (TokenBudget): Optional budget for the call
+        avoid (list): Sentences from other sections the new text must not restate
+
+    Returns:
+        dict: Updated blog state
+    """
+    section = outline.section(section_id)
+    index = outline.index(section_id)
+    ids = [outline_section.id for outline_section in outline]
+    section_words = BLOG_TARGET_WORDS // len(outline)
+    previous_text = tail_tokens(blog['sections'][ids[index - 1]], PREVIOUS_CONTEXT_TOKENS) if index > 0 else 'None'
+    next_text = blog['sections'][ids[index + 1]][:PREVIOUS_CONTEXT_TOKENS * 4] if index + 1 < len(ids) else 'None'
+
+    # Ask only for the keyword uses the other sections don't already cover
+    primary_kw_list, secondary_kw_list = blog_keywords(form_data)
+    other_usage = total_keyword_usage(blog['keyword_usage'], exclude=section_id)
+    missing_primary = [kw for kw in primary_kw_list if other_usage.get(kw, 0) < 3]
+    missing_secondary = [kw for kw in secondary_kw_list if not other_usage.get(kw, 0)]
+    keyword_instructions = ""
+    if missing_primary:
+        keyword_instructions += f"\n- Naturally use these primary keywords once each: {', '.join(missing_primary)}"
+    if missing_secondary:
+        keyword_instructions += f"\n- Naturally use these secondary keywords once each: {', '.join(missing_secondary)}"
+    keyword_instructions += "\n- DO NOT mention \"keywords\" or the process of keyword incorporation in the final text"
+    if avoid:
+        keyword_instructions += "\n- These points are already made elsewhere in the blog; do not restate them:\n" + \
+            '\n'.join(f"  * {sentence}" for sentence in avoid)
+
+    details = blog_details(form_data)
+
+    section_prompt = f"""Rewrite one section of an existing blog post with a fresh take.
+
+Section Outline:
+{section.render()}
+
+{details}
+
+Guidelines:
+- Word count for this section: Approximately {section_words} words
+- Do not repeat points made in the previous or next section
+- Ensure smooth transitions from the previous section into the next one
+- Use correct grammar, short sentences and a professional yet conversational tone{keyword_instructions}
+
+Previous Section:
+{previous_text}
+
+Next Section:
+{next_text}
+
+Current Blog Summary:
+{blog['summary']}
+
+Output the new section content first. Then output a line containing only {SUMMARY_DELIMITER}, followed by the blog summary revised only as far as the new section requires."""
+    response = generate_text(section_prompt, 'section', budget, output_words=section_words + 200,
+                             label=f'section {section_id} (regenerate)')
+    section_content, _, summary = response.partition(SUMMARY_DELIMITER)
+
+    sections = dict(blog['sections'])
+    sections[section_id] = section_content.strip()
+    keyword_usage = dict(blog['keyword_usage'])
+    keyword_usage[section_id] = count_keywords(sections[section_id], primary_kw_list + secondary_kw_list)
+    return {
+        'sections': sections,
+        'summary': summary.strip() or blog['summary'],
+        'keyword_usage': keyword_usage,
+    }
+
+_section_store_lock = threading.Lock()
+
+def store_regenerated_section(outline_id, section_id, updated):
+    """
+    Merge one regenerated section into the latest stored copy of its blog and
+    archive the result, so concurrent regenerations of other sections of the
+    same blog are kept.
+
+    Returns:
+        dict: The stored blog state
+    """
+    with _section_store_lock:
+        current = _blog_store.get(outline_id) or updated
+        sections = dict(current['sections'])
+        sections[section_id] = updated['sections'][section_id]
+        keyword_usage = dict(current['keyword_usage'])
+        keyword_usage[section_id] = updated['keyword_usage'][section_id]
+        blog = {'sections': sections, 'summary': updated['summary'], 'keyword_usage': keyword_usage}
+        _blog_store.put(outline_id, blog)
+        blog_archive.update_blog(outline_id, blog)
+        return blog
+
+# Cross-section redundancy. Sentences are MinHashed over word 3-shingles and
+# bucketed with LSH bands; a sentence that nearly matches (estimated Jaccard
+# of REDUNDANCY_SENTENCE_SIMILARITY or more) one in an earlier section counts
+# as repeated. A freshly generated blog whose worst section repeats
+# REDUNDANCY_THRESHOLD of its words or more gets that section regenerated once.
+REDUNDANCY_THRESHOLD = float(os.getenv('REDUNDANCY_THRESHOLD', 0.2))
+REDUNDANCY_SENTENCE_SIMILARITY = 0.5
+REDUNDANCY_MIN_SENTENCE_WORDS = 6
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 32
+# Each salted 64-byte blake2b digest gives 16 independent 32-bit hash values
+_MINHASH_SALTS = tuple(bytes([i]) * 16 for i in range(MINHASH_PERMUTATIONS // 16))
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+_SHINGLE_WORD_RE = re.compile(r"[a-z0-9']+")
+
+def minhash(shingles):
+    """MinHash signature of a set of strings."""
+    rows = [memoryview(b''.join(hashlib.blake2b(shingle.encode(), digest_size=64, salt=salt).digest()
+                                for salt in _MINHASH_SALTS)).cast('I') for shingle in shingles]
+    return tuple(map(min, zip(*rows)))
+
+def _sentence_signatures(text):
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        words = _SHINGLE_WORD_RE.findall(sentence.lower())
+        if len(words) >= REDUNDANCY_MIN_SENTENCE_WORDS:
+            shingles = {' '.join(words[i:i + 3]) for i in range(len(words) - 2)}
+            yield sentence.strip(), len(words), minhash(shingles)
+
+def redundancy_report(sections):
+    """
+    Score how much each section repeats the sections before it.
+
+    Args:
+        sections (list): (section_id, text) pairs in blog order
+
+    Returns:
+        dict: 'score' (repeated share of all words), 'sections' ({id: repeated
+            share of the section's words}) and 'repeats' ({id: earlier
+            sentences that section restates})
+    """
+    rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+    buckets = {}
+    scores = {}
+    repeats = {}
+    total_words = repeated_words = 0
+    for position, (section_id, text) in enumerate(sections):
+        section_words = section_repeated = 0
+        matched = []
+        signatures = list(_sentence_signatures(text))
+        for sentence, words, signature in signatures:
+            section_words += words
+            candidates = set()
+            for band in range(MINHASH_BANDS):
+                candidates.update(buckets.get((band, signature[band * rows:(band + 1) * rows]), ()))
+            best = None
+            for other_sentence, other_signature in candidates:
+                similarity = sum(x == y for x, y in zip(signature, other_signature)) / MINHASH_PERMUTATIONS
+                if similarity >= REDUNDANCY_SENTENCE_SIMILARITY and (best is None or similarity > best[0]):
+                    best = (similarity, other_sentence)
+            if best is not None:
+                section_repeated += words
+                matched.append(best[1])
+        # Index after scoring so repetition within a section doesn't count
+        for sentence, _, signature in signatures:
+            for band in range(MINHASH_BANDS):
+                buckets.setdefault((band, signature[band * rows:(band + 1) * rows]), []).append((sentence, signature))
+        scores[section_id] = round(section_repeated / section_words, 3) if section_words else 0.0
+        if matched:
+            repeats[section_id] = list(dict.fromkeys(matched))
+        total_words += section_words
+        repeated_words += section_repeated
+    return {'score': round(repeated_words / total_words, 3) if total_words else 0.0,
+            'sections': scores, 'repeats': repeats}
+
+def reduce_redundancy(outline, outline_id, form_data):
+    """
+    Regenerate the most repetitive section of a stored blog if it crosses
+    REDUNDANCY_THRESHOLD.
+
+    Returns:
+        tuple: (blog state, redundancy report); the report names the section
+            under 'regenerated' when one was rewritten
+    """
+    blog = _blog_store.get(outline_id)
+    ids = [section.id for section in outline]
+    report = redundancy_report([(section_id, blog['sections'][section_id]) for section_id in ids])
+    worst = max(ids, key=lambda section_id: report['sections'][section_id])
+    if report['sections'][worst] < REDUNDANCY_THRESHOLD:
+        return blog, report
+
+    print(f"Section {worst} repeats {report['sections'][worst]:.0%} of earlier content; regenerating it")
+    try:
+        blog = regenerate_section(outline, worst, blog, form_data, TokenBudget(max_calls=1), avoid=report['repeats'][worst])
+    except Exception as e:
+        print(f"Redundancy regeneration error: {e}")
+        return blog, report
+    _blog_store.put(outline_id, blog)
+    report = redundancy_report([(section_id, blog['sections'][section_id]) for section_id in ids])
+    report['regenerated'] = worst
+    return blog, report
+
+# Every generated blog and FAQ is archived in SQLite with an FTS5 index over
+# its inputs and text, so similar requests can be searched for and seeded
+# from an earlier blog. An empty BLOG_ARCHIVE_PATH disables the archive.
+# Entries are scoped to the session that created them; a request carrying
+# ARCHIVE_TOKEN in the X-Archive-Token header can search and seed from all.
+BLOG_ARCHIVE_PATH = os.getenv('BLOG_ARCHIVE_PATH', 'blog_archive.sqlite3')
+ARCHIVE_TOKEN = os.getenv('ARCHIVE_TOKEN')
+ARCHIVE_HEADER = 'X-Archive-Token'
+ARCHIVE_SEARCH_LIMIT = 50
+
+_ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    kind TEXT NOT NULL,
+    sid TEXT,
+    outline_id TEXT UNIQUE,
+    params TEXT NOT NULL,
+    topic TEXT NOT NULL DEFAULT '',
+    keywords TEXT NOT NULL DEFAULT '',
+    outline TEXT,
+    outline_json TEXT,
+    sections TEXT,
+    content TEXT,
+    summary TEXT,
+    faq TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    topic, keywords, outline, content, summary, faq, content='entries', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, topic, keywords, outline, content, summary, faq)
+    VALUES (new.id, new.topic, new.keywords, new.outline, new.content, new.summary, new.faq);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, topic, keywords, outline, content, summary, faq)
+    VALUES ('delete', old.id, old.topic, old.keywords, old.outline, old.content, old.summary, old.faq);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, topic, keywords, outline, content, summary, faq)
+    VALUES ('delete', old.id, old.topic, old.keywords, old.outline, old.content, old.summary, old.faq);
+    INSERT INTO entries_fts(rowid, topic, keywords, outline, content, summary, faq)
+    VALUES (new.id, new.topic, new.keywords, new.outline, new.content, new.summary, new.faq);
+END;
+"""
+
+def _request_topic(form_data):
+    if form_data.get('type') == 'product':
+        return ' '.join(form_data.get(name) or '' for name in ('product_title', 'product_description', 'intent'))
+    return form_data.get('prompt') or ''
+
+def _request_keywords(form_data):
+    primary_kw_list, secondary_kw_list = blog_keywords(form_data)
+    return ', '.join(keyword for keyword in primary_kw_list + secondary_kw_list if keyword)
+
+class BlogArchive:
+    """SQLite archive of generated blogs and FAQs, opened on first use."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_ARCHIVE_SCHEMA)
+            # Archives created before entries were scoped get the column
+            # added; their rows have no owner and only the operator sees them
+            if 'sid' not in [row['name'] for row in conn.execute('PRAGMA table_info(entries)')]:
+                conn.execute('ALTER TABLE entries ADD COLUMN sid TEXT')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_sid ON entries(sid)')
+            self._conn = conn
+        return self._conn
+
+    def _write(self, sql, params):
+        if not self.path:
+            return
+        try:
+            with self._lock, self._db() as conn:
+                conn.execute(sql, params)
+        except sqlite3.Error as e:
+            print(f"Blog archive error: {e}")
+
+    def add_blog(self, form_data, result, outline, blog, sid):
+        params = {key: value for key, value in form_data.items() if key != 'seed_archive'}
+        self._write(
+            """INSERT INTO entries (created, kind, sid, outline_id, params, topic, keywords, outline,
+                                    outline_json, sections, content, summary)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (time.time(), form_data['type'], sid, result['outline_id'], json.dumps(params), _request_topic(form_data),
+             _request_keywords(form_data), result['outline'], outline.to_json() if outline else None,
+             json.dumps(blog['sections']) if blog else None,
+             result['content'], result['summary']))
+
+    def update_blog(self, outline_id, blog):
+        self._write("UPDATE entries SET sections = ?, content = ?, summary = ? WHERE outline_id = ?",
+                    (json.dumps(blog['sections']), '\n\n'.join(blog['sections'].values()), blog['summary'], outline_id))
+
+    def add_faq(self, blog_content, faq_count, faq_content, sid):
+        self._write("INSERT INTO entries (created, kind, sid, params, content, faq) VALUES (?, 'faq', ?, ?, ?, ?)",
+                    (time.time(), sid, json.dumps({'faq_count': faq_count}), blog_content, faq_content))
+
+    def search(self, query, sid, kinds=None, limit=10):
+        """
+        Rank archived entries against free text with BM25, inputs weighted
+        above body text. Only entries created by sid are searched; a sid of
+        None searches the whole archive.
+
+        Returns:
+            list: dicts with id, kind, created, topic, keywords, snippet, score
+        """
+        terms = _SHINGLE_WORD_RE.findall(query.lower())
+        if not self.path or not terms:
+            return []
+        match = ' OR '.join(f'"{term}"' for term in dict.fromkeys(terms))
+        sql = """SELECT e.id, e.kind, e.created, e.topic, e.keywords,
+                        snippet(entries_fts, 3, '[', ']', '...', 16) AS snippet,
+                        bm25(entries_fts, 6.0, 8.0, 3.0, 1.0, 2.0, 1.0) AS score
+                 FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid
+                 WHERE entries_fts MATCH ?"""
+        params = [match]
+        if sid is not None:
+            sql += " AND e.sid = ?"
+            params.append(sid)
+        if kinds:
+            sql += f" AND e.kind IN ({', '.join('?' * len(kinds))})"
+            params += list(kinds)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(max(1, min(int(limit), ARCHIVE_SEARCH_LIMIT)))
+        try:
+            with self._lock:
+                return [dict(row) for row in self._db().execute(sql, params)]
+        except sqlite3.Error as e:
+            print(f"Blog archive error: {e}")
+            return []
+
+    def get(self, entry_id, sid):
+        if not self.path:
+            return None
+        sql, params = "SELECT * FROM entries WHERE id = ?", [entry_id]
+        if sid is not None:
+            sql += " AND sid = ?"
+            params.append(sid)
+        try:
+            with self._lock:
+                row = self._db().execute(sql, params).fetchone()
+        except sqlite3.Error as e:
+            print(f"Blog archive error: {e}")
+            return None
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['params'] = json.loads(entry['params'])
+        entry['sections'] = json.loads(entry['sections']) if entry['sections'] else None
+        return entry
+
+    def find_seed(self, form_data, seed, sid):
+        """The archived blog to start from: an entry id, or 'auto' for the closest match."""
+        if seed == 'auto':
+            matches = self.search(f"{_request_topic(form_data)} {_request_keywords(form_data)}", sid,
+                                  kinds=('product', 'general'), limit=1)
+            entry = self.get(matches[0]['id'], sid) if matches else None
+        else:
+            entry = self.get(int(seed), sid) if str(seed).isdigit() else None
+        if entry is None or not entry['sections'] or not entry['outline_json']:
+            return None
+        return entry
+
+blog_archive = BlogArchive(BLOG_ARCHIVE_PATH)
+
+def run_seeded_pipeline(form_data, entry, skip=()):
+    """
+    Adapt an archived blog to a new request in a single edit pass that also
+    returns the new summary.
+    """
+    budget = TokenBudget()
+    outline = Outline.from_json(entry['outline_json'])
+    draft = join_sections({section.id: entry['sections'][section.id] for section in outline})
+    primary_kw_list, secondary_kw_list = blog_keywords(form_data)
+    adapt_prompt = f"""Adapt an existing blog post to a new brief. Keep its structure and whatever still applies, and rewrite everything that doesn't.
+
+New Brief:
+{blog_details(form_data)}
+
+Guidelines:
+- Replace names, facts and claims from the original that don't match the new brief
+- Naturally use these primary keywords 2-3 times each: {', '.join(primary_kw_list)}
+- Naturally use these secondary keywords at least once each: {', '.join(secondary_kw_list)}
+- DO NOT mention "keywords" or the process of keyword incorporation in the final text
+- Use correct grammar, short sentences and a professional yet conversational tone{SECTION_MARKER_INSTRUCTION}
+
+Original Blog:
+{draft}
+
+Output the adapted blog first. Then output a line containing only {SUMMARY_DELIMITER}, followed by a concise and engaging summary (150-200 words) of the adapted blog."""
+    response = generate_text(adapt_prompt, 'adapt', budget, output_words=len(draft.split()) + 200)
+    adapted, _, summary = response.partition(SUMMARY_DELIMITER)
+
+    section_texts = {}
+    blog_content = _finish_sections(adapted.strip(), outline, section_texts)
+    blog_summary = summary.strip() or entry['summary']
+    result = {'outline': entry['outline'], 'content': blog_content, 'summary': blog_summary, 'outline_id': None,
+              'sections': [], 'redundancy': None, 'seeded_from': entry['id']}
+    # The archived sections belong to another brief, so they are never a
+    # fallback: without markers the adapted blog has no per-section state
+    if section_texts:
+        result['outline_id'] = cache_outline(outline)
+        result['sections'] = [(section.id, section.title) for section in outline]
+        remember_blog(result['outline_id'], section_texts, blog_summary, form_data)
+    return result
+
+def generate_blog(form_data, sid, seed_scope, seed=None):
+    """
+    Run the pipeline for a product or general blog request and archive the
+    result under sid. With a seed ('auto' or an archive id) the closest
+    archived blog visible to seed_scope is adapted instead when one is found.
+    """
+    entry = blog_archive.find_seed(form_data, seed, seed_scope) if seed else None
+    if entry is not None:
+        result = admitted('seeded', lambda data, skip: run_seeded_pipeline(data, entry, skip), form_data)
+    elif form_data['type'] == 'product':
+        result = admitted('product', run_product_pipeline, form_data)
+    else:
+        result = admitted('general', run_general_pipeline, form_data)
+    blog_archive.add_blog(form_data, result, get_cached_outline(result['outline_id']),
+                          _blog_store.get(result['outline_id']), sid)
+    return result
+
+def generate_archived_faq(blog_content, faq_count, sid):
+    faq_content = generate_faq_content(blog_content, faq_count)
+    if faq_content != FAQ_ERROR:
+        blog_archive.add_faq(blog_content, faq_count, faq_content, sid)
+    return faq_content
+
+def admitted(kind, pipeline, form_data):
+    """Run a pipeline under admission control, downgrading it if needed."""
+    skip = admission.admit(kind)
+    try:
+        result = pipeline(form_data, skip)
+    finally:
+        admission.release()
+    result['skipped'] = list(skip)
+    return result
+
+def _pipeline_result(blog_outline, outline, outline_id, section_texts, blog_content, blog_summary, form_data):
+    # Without per-section text the blog is returned as generated, with no
+    # outline_id so that section regeneration stays off for it
+    if not section_texts:
+        return {'outline': blog_outline, 'content': blog_content, 'summary': blog_summary, 'outline_id': None,
+                'sections': [], 'redundancy': None}
+    remember_blog(outline_id, section_texts, blog_summary, form_data)
+    blog, redundancy = reduce_redundancy(outline, outline_id, form_data)
+    if 'regenerated' in redundancy:
+        blog_content = '\n\n'.join(blog['sections'][section.id] for section in outline)
+        blog_summary = blog['summary']
+    return {'outline': blog_outline, 'content': blog_content, 'summary': blog_summary, 'outline_id': outline_id,
+            'sections': [(section.id, section.title) for section in outline], 'redundancy': redundancy}
+
+def run_product_pipeline(form_data, skip=()):
+    """Generate outline, sections and summary for a product blog request."""
+    budget = TokenBudget()
+    blog_outline = generate_blog_outline(form_data['product_url'], form_data['product_title'], form_data['product_description'], form_data['primary_keywords'], form_data['secondary_keywords'], form_data['intent'], budget)
+    outline = plan_outline(blog_outline, budget)
+    outline_id = cache_outline(outline)
+    section_texts = {}
+    with BlogContext(product_blog_context(form_data['product_url'], form_data['product_title'], form_data['product_description'], form_data['primary_keywords'], form_data['secondary_keywords'], form_data['intent'])) as context:
+        blog_content = generate_blog_content(outline, form_data['product_url'], form_data['product_title'], form_data['product_description'], form_data['primary_keywords'], form_data['secondary_keywords'], form_data['intent'], budget, section_texts, context, skip)
+        blog_summary = generate_blog_summary(blog_content, form_data['primary_keywords'], form_data['secondary_keywords'], form_data['intent'], budget, context)
+    return _pipeline_result(blog_outline, outline, outline_id, section_texts, blog_content, blog_summary, form_data)
+
+def run_general_pipeline(form_data, skip=()):
+    """Generate outline, sections and summary for a general blog request."""
+    budget = TokenBudget()
+    blog_outline = generate_general_blog_outline(form_data['keywords'], form_data['primary_keywords'], form_data['prompt'], budget)
+    outline = plan_outline(blog_outline, budget, reserved_calls=3)
+    outline_id = cache_outline(outline)
+    section_texts = {}
+    with BlogContext(general_blog_context(form_data['keywords'], form_data['primary_keywords'], form_data['prompt'])) as context:
+        blog_content = generate_general_blog_content(outline, form_data['keywords'], form_data['primary_keywords'], form_data['prompt'], budget, section_texts, context, skip)
+        blog_summary = generate_blog_summary(blog_content, form_data['primary_keywords'], form_data['keywords'], intent="informative", budget=budget, context=context)
+    return _pipeline_result(blog_outline, outline, outline_id, section_texts, blog_content, blog_summary, form_data)
 
 # HTML templates
 INDEX_TEMPLATE = '''
@@ -696,6 +2891,10 @@ INDEX_TEMPLATE = '''
                         <label class="block mb-2 text-gray-700 group-hover:text-blue-600 transition">Search Intent</label>
                         <input type="text" name="intent" required class="w-full p-3 border-2 border-gray-200 rounded-lg focus:outline-none focus:border-blue-500 transition">
                     </div>
+                    <label class="flex items-center text-gray-700">
+                        <input type="checkbox" name="seed_archive" value="auto" class="mr-2">
+                        Start from the closest of your archived blogs (one edit pass instead of a full generation)
+                    </label>
                     <button type="button" onclick="submitForm('product-form', 'grid-loader')" class="w-full bg-gradient-to-r from-blue-500 to-purple-600 text-white p-3 rounded-lg hover:from-blue-600 hover:to-purple-700 transition duration-300 ease-in-out transform hover:scale-105 hover:shadow-lg">
                         Generate Blog
                     </button>
@@ -717,6 +2916,10 @@ INDEX_TEMPLATE = '''
                         <label class="block mb-2 text-gray-700 group-hover:text-purple-600 transition">Prompt</label>
                         <textarea name="prompt" required class="w-full p-3 border-2 border-gray-200 rounded-lg focus:outline-none focus:border-purple-500 transition" rows="4"></textarea>
                     </div>
+                    <label class="flex items-center text-gray-700">
+                        <input type="checkbox" name="seed_archive" value="auto" class="mr-2">
+                        Start from the closest of your archived blogs (one edit pass instead of a full generation)
+                    </label>
                     <button type="button" onclick="submitForm('general-form', 'grid-loader')" class="w-full bg-gradient-to-r from-purple-500 to-blue-600 text-white p-3 rounded-lg hover:from-purple-600 hover:to-blue-700 transition duration-300 ease-in-out transform hover:scale-105 hover:shadow-lg">
                         Generate Blog
                     </button>
@@ -732,7 +2935,7 @@ INDEX_TEMPLATE = '''
                     </div>
                     <div class="group">
                         <label class="block mb-2 text-gray-700 group-hover:text-teal-600 transition">Number of FAQs (optional)</label>
-                        <input type="number" name="faq_count" min="1" max="20" value="5" class="w-full p-3 border-2 border-gray-200 rounded-lg focus:outline-none focus:border-teal-500 transition">
+                        <input type="number" name="faq_count" min="1" max="50" value="5" class="w-full p-3 border-2 border-gray-200 rounded-lg focus:outline-none focus:border-teal-500 transition">
                     </div>
                     <button type="button" onclick="submitForm('faq-form', 'grid-loader')" class="w-full bg-gradient-to-r from-teal-500 via-cyan-500 to-teal-600 text-black p-3 rounded-lg font-semibold shadow-lg hover:shadow-xl hover:from-teal-600 hover:via-cyan-600 hover:to-teal-700 transition-all duration-300 ease-in-out transform hover:scale-105 hover:animate-pulse">
                         Generate FAQs
@@ -782,6 +2985,14 @@ RESULT_TEMPLATE = '''
                 .then(response => response.json())
                 .then(data => {
                     hideLoader('quantum-loader');
+                    if (data.error) {
+                        alert('Error: ' + data.error);
+                        return;
+                    }
+                    const fallbackChunks = data.humanizer.chunks.gemini || 0;
+                    document.getElementById('humanize-note').textContent = fallbackChunks
+                        ? `HIX is unavailable (circuit ${data.humanizer.circuit.state}); ${fallbackChunks} chunk(s) were rewritten with Gemini instead.`
+                        : '';
                     document.getElementById('humanized-content').textContent = data.humanized_content;
                     document.getElementById('humanize-section').style.display = 'block';
                 })
@@ -829,6 +3040,14 @@ RESULT_TEMPLATE = '''
                 } else {
                     document.getElementById('blog-outline').textContent = data.outline || 'N/A';
                     document.getElementById('blog-content').textContent = data.content;
+                    showRedundancy(data.redundancy);
+                    const sectionSelect = document.getElementById('section-select');
+                    if (sectionSelect && data.sections) {
+                        sectionSelect.innerHTML = '';
+                        data.sections.forEach(([sectionId, title]) => {
+                            sectionSelect.add(new Option(title, sectionId));
+                        });
+                    }
                     document.getElementById('humanize-section').style.display = 'none';
                     document.getElementById('blog-summary').textContent = data.summary || 'N/A';
                     if (data.faq_content) {
@@ -845,6 +3064,46 @@ RESULT_TEMPLATE = '''
                 alert('Failed to regenerate content');
             });
         }
+
+        function showRedundancy(redundancy) {
+            const note = document.getElementById('redundancy-note');
+            if (!redundancy) {
+                note.textContent = '';
+                return;
+            }
+            note.textContent = 'Repeated content across sections: ' + Math.round(redundancy.score * 100) + '%'
+                + (redundancy.regenerated ? ' (one repetitive section was rewritten automatically)' : '');
+        }
+
+        function regenerateSection() {
+            showLoader('quantum-loader');
+            fetch('/regenerate/section', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    section_id: document.getElementById('section-select').value
+                })
+            })
+            .then(response => response.json())
+            .then(data => {
+                hideLoader('quantum-loader');
+                if (data.error) {
+                    alert('Error: ' + data.error);
+                } else {
+                    document.getElementById('blog-content').textContent = data.content;
+                    document.getElementById('blog-summary').textContent = data.summary || 'N/A';
+                    document.getElementById('humanize-section').style.display = 'none';
+                    showRedundancy(data.redundancy);
+                }
+            })
+            .catch(error => {
+                hideLoader('quantum-loader');
+                console.error('Error:', error);
+                alert('Failed to regenerate section');
+            });
+        }
     </script>
 </head>
 <body class="bg-gradient-to-br from-gray-100 to-gray-200 min-h-screen flex items-center justify-center p-4">
@@ -881,6 +3140,7 @@ RESULT_TEMPLATE = '''
                     </svg>
                     Blog Content
                 </h2>
+                <p id="redundancy-note" class="mb-4 text-sm text-gray-500">{% if redundancy %}Repeated content across sections: {{ (redundancy.score * 100) | round | int }}%{% if redundancy.regenerated %} (one repetitive section was rewritten automatically){% endif %}{% endif %}</p>
                 <div class="prose max-w-none">
                     <pre id="blog-content" contenteditable="true" class="bg-gray-50 p-4 rounded-lg border border-gray-200 whitespace-pre-wrap text-gray-800 focus:ring-2 focus:ring-purple-500 transition">{{ content }}</pre>
                 </div>
@@ -926,6 +3186,22 @@ RESULT_TEMPLATE = '''
                 </a>
             </div>
 
+            {% if sections %}
+            <div id="section-regenerate" class="flex justify-center items-center space-x-4">
+                <select id="section-select" class="p-3 border-2 border-gray-200 rounded-lg focus:outline-none focus:border-purple-500 transition">
+                    {% for section_id, title in sections %}
+                    <option value="{{ section_id }}">{{ title }}</option>
+                    {% endfor %}
+                </select>
+                <button onclick="regenerateSection()" class="flex items-center bg-gradient-to-r from-pink-500 to-purple-600 text-white px-6 py-3 rounded-lg hover:from-pink-600 hover:to-purple-700 transition transform hover:scale-105 shadow-lg">
+                    <svg xmlns="http://www.w3.org/2000/svg" class="h-5 w-5 mr-2" fill="none" viewBox="0 0 24 24" stroke="currentColor">
+                        <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 4v5h.582m15.356 2A8.001 8.001 0 004.582 9H0m0 0v5h5.582M21 12a9 9 0 11-18 0 9 9 0 0118 0z" />
+                    </svg>
+                    Regenerate Section
+                </button>
+            </div>
+            {% endif %}
+
             <div id="humanize-section" style="display:none;" class="bg-white border-2 border-gray-100 rounded-xl p-6 shadow-lg">
                 <h2 class="text-2xl font-bold mb-4 text-green-600 flex items-center">
                     <svg xmlns="http://www.w3.org/2000/svg" class="h-6 w-6 mr-3" fill="none" viewBox="0 0 24 24" stroke="currentColor">
@@ -933,6 +3209,7 @@ RESULT_TEMPLATE = '''
                     </svg>
                     Humanized Blog Content
                 </h2>
+                <p id="humanize-note" class="mb-4 text-sm text-yellow-700"></p>
                 <pre id="humanized-content" class="bg-gray-50 p-4 rounded-lg border border-gray-200 whitespace-pre-wrap text-gray-700"></pre>
             </div>
         </div>
@@ -945,6 +3222,75 @@ RESULT_TEMPLATE = '''
 </html>
 '''
 
+def prewarm():
+    """
+    Initialize the SDK, the model clients and the HIX connection pool ahead of
+    the first request. Meant to run in the background right after a worker
+    forks; failures are only logged since requests initialize lazily anyway.
+    """
+    start = time.perf_counter()
+    try:
+        for names in MODEL_TIERS.values():
+            for name in names:
+                model_router.model(name)
+        get_http_session().head(HIX_BASE_URL, timeout=5)
+    except Exception as e:
+        print(f"Prewarm error: {e}")
+    print(f"Prewarm finished in {time.perf_counter() - start:.2f}s")
+
+@app.route('/healthz')
+def healthz():
+    return 'ok', 200, {'Content-Type': 'text/plain'}
+
+@app.route('/readyz')
+def readyz():
+    checks = {
+        'gemini_key': bool(GEMINI_API_KEY),
+        'hix_key': bool(HIX_API_KEY),
+        'gemini_initialized': _genai is not None,
+    }
+    ready = checks['gemini_key'] and checks['hix_key']
+    return jsonify({'ready': ready, **checks}), 200 if ready else 503
+
+@app.route('/metrics')
+def metrics():
+    return jsonify({
+        'admission': admission.snapshot(),
+        'upstream': upstream_scheduler.snapshot(),
+        'stage_latency': stage_latency.snapshot(),
+        'coalesced': {'requests': request_flight.coalesced, 'upstream': upstream_flight.coalesced},
+        'hix': hix_breaker.snapshot(),
+        'ttft': model_router.ttft_report(),
+    })
+
+def overloaded_response(e):
+    response = jsonify({'error': str(e), 'admission': admission.snapshot()})
+    return response, 503, {'Retry-After': str(int(e.retry_after) + 1)}
+
+def archive_scope():
+    """The sid whose archive entries this request may see, or None for the operator."""
+    if ARCHIVE_TOKEN and request.headers.get(ARCHIVE_HEADER) == ARCHIVE_TOKEN:
+        return None
+    return session_id()
+
+@app.route('/archive/search')
+def search_archive():
+    query = request.args.get('q', '')
+    kinds = [kind for kind in request.args.get('kind', '').split(',') if kind]
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    return jsonify({'query': query, 'results': blog_archive.search(query, archive_scope(), kinds, limit)})
+
+@app.route('/archive/<int:entry_id>')
+def get_archived(entry_id):
+    entry = blog_archive.get(entry_id, archive_scope())
+    if entry is None:
+        return jsonify({'error': 'Archived entry not found'}), 404
+    entry.pop('outline_json', None)
+    return jsonify(entry)
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
@@ -954,6 +3300,7 @@ def index():
         primary_keywords = request.form.get('primary_keywords')
         secondary_keywords = request.form.get('secondary_keywords')
         intent = request.form.get('intent')
+        seed = request.form.get('seed_archive')
 
         session['form_data'] = {
             'product_url': product_url,
@@ -966,10 +3313,16 @@ def index():
         }
 
         try:
-            blog_outline = generate_blog_outline(product_url, product_title, product_description, primary_keywords, secondary_keywords, intent)
-            blog_content = generate_blog_content(blog_outline, product_url, product_title, product_description, primary_keywords, secondary_keywords, intent)
-            blog_summary = generate_blog_summary(blog_content, primary_keywords, secondary_keywords, intent)
-            return render_template_string(RESULT_TEMPLATE, outline=blog_outline, content=blog_content, summary=blog_summary)
+            scope = archive_scope()
+            result = request_flight.do(session_flight_key('product', session['form_data'], seed, scope is None),
+                                       lambda: generate_blog(session['form_data'], session_id(), scope, seed))
+            session['outline_id'] = result['outline_id']
+            with profile_stage('render'):
+                return render_template_string(RESULT_TEMPLATE, outline=result['outline'], content=result['content'],
+                                              summary=result['summary'], sections=result['sections'],
+                                              redundancy=result['redundancy'])
+        except (OverloadedError, UpstreamBusyError) as e:
+            return overloaded_response(e)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     return render_template_string(INDEX_TEMPLATE)
@@ -979,6 +3332,7 @@ def generate_general_blog():
     keywords = request.form.get('keywords')
     primary_keywords = request.form.get('primary_keywords')
     prompt = request.form.get('prompt')
+    seed = request.form.get('seed_archive')
 
     session['form_data'] = {
         'keywords': keywords,
@@ -988,10 +3342,16 @@ def generate_general_blog():
     }
 
     try:
-        blog_outline = generate_general_blog_outline(keywords, primary_keywords, prompt)
-        blog_content = generate_general_blog_content(blog_outline, keywords, primary_keywords, prompt)
-        blog_summary = generate_blog_summary(blog_content, primary_keywords, keywords, intent="informative")
-        return render_template_string(RESULT_TEMPLATE, outline=blog_outline, content=blog_content, summary=blog_summary)
+        scope = archive_scope()
+        result = request_flight.do(session_flight_key('general', session['form_data'], seed, scope is None),
+                                   lambda: generate_blog(session['form_data'], session_id(), scope, seed))
+        session['outline_id'] = result['outline_id']
+        with profile_stage('render'):
+            return render_template_string(RESULT_TEMPLATE, outline=result['outline'], content=result['content'],
+                                          summary=result['summary'], sections=result['sections'],
+                                          redundancy=result['redundancy'])
+    except (OverloadedError, UpstreamBusyError) as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1002,19 +3362,51 @@ def regenerate_content():
         if not form_data:
             return jsonify({"error": "No previous form data found"}), 400
 
-        if form_data.get('type') == 'product':
-            blog_outline = generate_blog_outline(form_data['product_url'], form_data['product_title'], form_data['product_description'], form_data['primary_keywords'], form_data['secondary_keywords'], form_data['intent'])
-            blog_content = generate_blog_content(blog_outline, form_data['product_url'], form_data['product_title'], form_data['product_description'], form_data['primary_keywords'], form_data['secondary_keywords'], form_data['intent'])
-            blog_summary = generate_blog_summary(blog_content, form_data['primary_keywords'], form_data['secondary_keywords'], form_data['intent'])
-            return jsonify({'outline': blog_outline, 'content': blog_content, 'summary': blog_summary})
-        elif form_data.get('type') == 'general':
-            blog_outline = generate_general_blog_outline(form_data['keywords'], form_data['primary_keywords'], form_data['prompt'])
-            blog_content = generate_general_blog_content(blog_outline, form_data['keywords'], form_data['primary_keywords'], form_data['prompt'])
-            blog_summary = generate_blog_summary(blog_content, form_data['primary_keywords'], form_data['keywords'], intent="informative")
-            return jsonify({'outline': blog_outline, 'content': blog_content, 'summary': blog_summary})
+        if form_data.get('type') in ('product', 'general'):
+            result = request_flight.do(session_flight_key('regenerate', form_data), lambda: generate_blog(form_data, session_id(), archive_scope()))
         elif form_data.get('type') == 'faq':
-            faq_content = generate_faq_content(form_data['blog_content'], form_data['faq_count'])
+            faq_content = request_flight.do(session_flight_key('regenerate', form_data),
+                                            lambda: generate_archived_faq(form_data['blog_content'], form_data['faq_count'],
+                                                                          session_id()))
             return jsonify({'outline': None, 'content': form_data['blog_content'], 'summary': None, 'faq_content': faq_content})
+        else:
+            return jsonify({"error": "Unknown content type"}), 400
+        session['outline_id'] = result['outline_id']
+        return jsonify({'outline': result['outline'], 'content': result['content'], 'summary': result['summary'],
+                        'sections': result['sections'], 'skipped': result['skipped'],
+                        'redundancy': result['redundancy']})
+    except (OverloadedError, UpstreamBusyError) as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/regenerate/section', methods=['POST'])
+def regenerate_blog_section():
+    try:
+        data = request.get_json(silent=True) or {}
+        section_id = data.get('section_id')
+        form_data = session.get('form_data', {})
+        outline_id = session.get('outline_id')
+        outline = get_cached_outline(outline_id)
+        blog = _blog_store.get(outline_id) if outline_id else None
+        if not form_data or outline is None or blog is None:
+            return jsonify({"error": "No previous blog found to regenerate"}), 400
+        if section_id not in blog['sections']:
+            return jsonify({"error": f"Unknown section: {section_id}"}), 400
+
+        def regenerate():
+            updated = regenerate_section(outline, section_id, blog, form_data, TokenBudget(max_calls=1))
+            return store_regenerated_section(outline_id, section_id, updated)
+
+        blog = request_flight.do(session_flight_key('regenerate_section', outline_id, section_id), regenerate)
+        return jsonify({
+            'section_id': section_id,
+            'section': blog['sections'][section_id],
+            'content': '\n\n'.join(blog['sections'].values()),
+            'summary': blog['summary'],
+            'keyword_usage': total_keyword_usage(blog['keyword_usage']),
+            'redundancy': redundancy_report([(section.id, blog['sections'][section.id]) for section in outline])
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1022,9 +3414,22 @@ def regenerate_content():
 def humanize_blog():
     try:
         data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
         content = data.get('content', '')
-        humanized_content = humanize_text(content)
-        return jsonify({'humanized_content': humanized_content})
+        def humanize():
+            chunk_sources = {}
+            return humanize_text(content, report=chunk_sources), chunk_sources
+
+        with profile_stage('humanize'):
+            humanized_content, chunk_sources = request_flight.do(flight_key('humanize', content, current_generation_overrides()), humanize)
+        return jsonify({
+            'humanized_content': humanized_content,
+            'humanizer': {'circuit': hix_breaker.snapshot(), 'chunks': chunk_sources}
+        })
+    except CircuitOpenError as e:
+        response = jsonify({'error': str(e), 'humanizer': {'circuit': hix_breaker.snapshot()}})
+        return response, 503, {'Retry-After': str(int(e.retry_after) + 1)}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1040,16 +3445,23 @@ def save_edits():
 @app.route('/faq', methods=['POST'])
 def generate_faq():
     blog_content = request.form.get('blog_content')
-    faq_count = int(request.form.get('faq_count', 5))
+    if not blog_content or not blog_content.strip():
+        return jsonify({"error": "blog_content is required"}), 400
+    try:
+        faq_count = max(1, min(int(request.form.get('faq_count') or 5), FAQ_MAX_COUNT))
+    except ValueError:
+        return jsonify({"error": "faq_count must be a number"}), 400
 
     session['form_data'] = {
         'blog_content': blog_content,
         'faq_count': faq_count,
         'type': 'faq'
     }
+    session.pop('outline_id', None)
 
     try:
-        faq_content = generate_faq_content(blog_content, faq_count)
+        faq_content = request_flight.do(session_flight_key('faq', blog_content, faq_count),
+                                        lambda: generate_archived_faq(blog_content, faq_count, session_id()))
         return render_template_string(RESULT_TEMPLATE, outline=None, content=blog_content, summary=None, faq_content=faq_content)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
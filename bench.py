@@ -0,0 +1,171 @@
+"""
+Micro-benchmarks for the blog generator's local hot paths.
+
+Run with ``python bench.py``. No Gemini or HIX calls are made; dummy API
+keys are set so that app.py can be imported without a .env file.
+"""
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('GEMINI_API_KEY', 'bench')
+os.environ.setdefault('HIX_API_KEY', 'bench')
+
+import app
+
+_VOCABULARY = (
+    "product blog content customers value feature quality design users team "
+    "market growth strategy platform results simple fast secure reliable"
+).split()
+
+def sample_markdown(word_count, seed=0):
+    """Build a blog-shaped markdown document of roughly word_count words."""
+    rng = random.Random(seed)
+    blocks = []
+    words = 0
+    while words < word_count:
+        if rng.random() < 0.1:
+            blocks.append(f"## {' '.join(rng.choices(_VOCABULARY, k=4)).title()}")
+            words += 5
+        elif rng.random() < 0.15:
+            items = [f"- **{rng.choice(_VOCABULARY)}** {' '.join(rng.choices(_VOCABULARY, k=8))}" for _ in range(4)]
+            blocks.append('\n'.join(items))
+            words += 40
+        else:
+            sentences = []
+            for _ in range(rng.randint(2, 8)):
+                length = rng.randint(6, 30)
+                sentences.append(' '.join(rng.choices(_VOCABULARY, k=length)).capitalize() + '.')
+                words += length
+            blocks.append(' '.join(sentences))
+    return '\n\n'.join(blocks)
+
+def _timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings)
+
+def _legacy_split(text, max_words=500):
+    # The original whitespace splitter, kept here as a baseline
+    words = text.split()
+    return [' '.join(words[i:i + max_words]) for i in range(0, len(words), max_words)]
+
+def bench_chunker(word_count=100_000, max_words=500, repeat=5):
+    text = sample_markdown(word_count)
+    spans, elapsed = _timed(lambda: app.chunk_spans(text, max_words), repeat)
+    _, legacy_elapsed = _timed(lambda: _legacy_split(text, max_words), repeat)
+    sizes = [len(text[start:end].split()) for start, end in spans]
+    print(f"chunk_spans: {word_count} words -> {len(spans)} chunks in {elapsed * 1000:.1f} ms "
+          f"(legacy split {legacy_elapsed * 1000:.1f} ms)")
+    print(f"  chunk words min/median/max: {min(sizes)}/{int(statistics.median(sizes))}/{max(sizes)}")
+
+def bench_redundancy(sections=5, section_words=300, repeat=5):
+    blog = [(f"s{i}", sample_markdown(section_words, seed=i)) for i in range(sections)]
+    report, elapsed = _timed(lambda: app.redundancy_report(blog), repeat)
+    print(f"redundancy_report: {sections} x {section_words} word sections in {elapsed * 1000:.1f} ms "
+          f"(score {report['score']})")
+
+class FakeResponse:
+    """Streams a canned answer; each chunk arrives after its delay."""
+
+    def __init__(self, text, delays):
+        self.text = text
+        self.usage_metadata = None
+        self._delays = delays
+
+    def __iter__(self):
+        for delay in self._delays:
+            time.sleep(delay)
+            yield self
+
+class FakeModel:
+    """
+    Local stand-in for a Gemini model. Time to first token grows with the
+    prompt length and total time with the number of output tokens, which
+    stops at generation_config's max_output_tokens like the real API.
+    """
+
+    def __init__(self, prefill_per_token=20e-6, decode_per_token=1e-3, output_tokens=300):
+        self.prefill_per_token = prefill_per_token
+        self.decode_per_token = decode_per_token
+        self.output_tokens = output_tokens
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        output_tokens = self.output_tokens
+        if generation_config and generation_config.get('max_output_tokens'):
+            output_tokens = min(output_tokens, generation_config['max_output_tokens'])
+        decode = output_tokens * self.decode_per_token
+        return FakeResponse('word ' * output_tokens,
+                            [app.estimate_tokens(prompt) * self.prefill_per_token, decode])
+
+class FakeCache:
+    def delete(self):
+        pass
+
+def bench_context_cache(prefix_tokens=40_000, calls=6):
+    """TTFT of section-sized calls with the shared blog context inline vs cached."""
+    app.model_router.model_factory = lambda name: FakeModel()
+    app.model_router._models.clear()
+    prefix = 'Product description. ' * (prefix_tokens // 5)
+    body = 'Generate the next section. ' * 100
+    for cache in (False, True):
+        with app.BlogContext(prefix, cache=cache, cache_factory=lambda name, text: (FakeModel(), FakeCache())) as context:
+            for _ in range(calls):
+                app.generate_text(body, 'section', context=context)
+    report = app.model_router.ttft_report()
+    print(f"context cache: TTFT inline {report['inline']['avg_ms']} ms vs cached {report['cached']['avg_ms']} ms "
+          f"({prefix_tokens} token prefix, {calls} calls each)")
+
+def bench_generation_profiles(calls=3, output_tokens=1500):
+    """Latency of calls whose answer runs past its target, with and without the stage profiles."""
+    app.model_router.model_factory = lambda name: FakeModel(decode_per_token=2e-4, output_tokens=output_tokens)
+    app.model_router._models.clear()
+    stages = (('summary', 200), ('section', 300), ('faq', 5 * 60))
+    profiled = app.generation_config
+    for label, config in (('uncapped', lambda stage, output_words=0: None), ('profiles', profiled)):
+        app.generation_config = config
+        try:
+            timings = {stage: _timed(lambda: app.generate_text(f"Write the {stage}.", stage, output_words=words), calls)[1]
+                       for stage, words in stages}
+        finally:
+            app.generation_config = profiled
+        print(f"generation profiles: {label} " +
+              ', '.join(f"{stage} {elapsed * 1000:.0f} ms" for stage, elapsed in timings.items()) +
+              f" (model runs on to {output_tokens} tokens)")
+
+_STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.get('/healthz')
+first_request = time.perf_counter()
+app.get_genai()
+sdk_ready = time.perf_counter()
+print(imported - start, first_request - imported, sdk_ready - first_request)
+"""
+
+def bench_startup(repeat=5):
+    """Import cost, first /healthz and lazy SDK init, each in a fresh interpreter."""
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        timings.append([float(value) for value in output.split()[-3:]])
+    imported, first_request, sdk_ready = (statistics.median(column) for column in zip(*timings))
+    print(f"startup: import app {imported * 1000:.0f} ms, first /healthz {first_request * 1000:.1f} ms, "
+          f"lazy Gemini SDK init {sdk_ready * 1000:.0f} ms")
+
+if __name__ == '__main__':
+    bench_chunker()
+    bench_redundancy()
+    bench_startup()
+    bench_context_cache()
+    bench_generation_profiles()
@@ -1 +1,15 @@
+import os
+import threading
+
 timeout = 120
+# Threaded workers so quick interactive requests aren't stuck behind a long
+# generation; app.UpstreamScheduler orders the upstream calls they make
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+def post_fork(server, worker):
+    # Warm the Gemini SDK and the HIX connection pool in the background so
+    # the worker starts accepting requests straight away
+    if os.getenv('PREWARM_UPSTREAM', '1') == '1':
+        from app import prewarm
+        threading.Thread(target=prewarm, daemon=True).start()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+os.environ.setdefault('GEMINI_API_KEY', 'test')
+os.environ.setdefault('HIX_API_KEY', 'test')
+os.environ.setdefault('BLOG_ARCHIVE_PATH', '')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
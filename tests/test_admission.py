@@ -0,0 +1,60 @@
+import pytest
+
+import app
+
+
+def _controller(**latency):
+    stages = app.StageLatency()
+    for stage, seconds in latency.items():
+        stages.latency[stage] = seconds
+    return app.AdmissionController(latency=stages, scheduler=app.UpstreamScheduler())
+
+
+def test_idle_worker_runs_every_pass():
+    controller = _controller()
+    for kind in app.PIPELINE_STAGES:
+        assert controller.admit(kind) == ()
+    assert controller.snapshot()['downgraded'] == 0
+
+
+def test_slow_upstream_drops_grammar_first():
+    assert _controller(section=12.0).admit('general') == ('grammar',)
+    assert _controller(section=14.0).admit('general') == ('grammar', 'keyword_verification')
+    assert _controller(section=14.0).admit('product') == ('grammar',)
+
+
+def test_load_downgrades_then_sheds():
+    controller = _controller()
+    controller.max_in_flight = 100
+    lanes = controller._lanes()
+    assert controller.estimate('general', in_flight=lanes - 1) == controller.estimate('general', in_flight=0)
+    controller.in_flight = 2 * lanes
+    assert controller.admit('general') == ('grammar', 'keyword_verification')
+    controller.in_flight = 4 * lanes
+    with pytest.raises(app.OverloadedError) as excinfo:
+        controller.admit('general')
+    assert 1.0 <= excinfo.value.retry_after <= controller.deadline
+    assert controller.snapshot()['shed'] == 1
+
+
+def test_release_frees_the_slot():
+    controller = _controller()
+    controller.admit('product')
+    assert controller.in_flight == 1
+    controller.release()
+    assert controller.in_flight == 0
+
+
+def test_failed_calls_raise_the_estimate(monkeypatch):
+    clock = [100.0]
+
+    def fail(*args, **kwargs):
+        clock[0] += 40
+        raise RuntimeError('deadline exceeded')
+
+    monkeypatch.setattr(app.model_router, 'generate', fail)
+    monkeypatch.setattr(app.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(app, 'stage_latency', app.StageLatency())
+    with pytest.raises(RuntimeError):
+        app.generate_text('prompt', 'summary')
+    assert app.stage_latency.estimate('summary') > app.STAGE_LATENCY_DEFAULTS['summary']
@@ -0,0 +1,88 @@
+import sqlite3
+
+import pytest
+
+import app
+
+OUTLINE = """## Introduction
+* Why standing desks matter for people who sit all day
+
+## Buying Guide
+* Motors, height range and load capacity compared side by side
+"""
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return app.BlogArchive(str(tmp_path / 'archive.sqlite3'))
+
+
+def _add_blog(archive, sid, prompt, outline_id):
+    form_data = {'type': 'general', 'prompt': prompt, 'keywords': 'cable tray', 'primary_keywords': 'standing desk'}
+    outline = app.Outline.parse(OUTLINE)
+    sections = {section.id: f"{section.title} text about {prompt}" for section in outline}
+    result = {'outline_id': outline_id, 'outline': OUTLINE, 'content': '\n\n'.join(sections.values()),
+              'summary': f"Summary of {prompt}"}
+    archive.add_blog(form_data, result, outline, {'sections': sections}, sid)
+    return form_data
+
+
+def test_query_syntax_is_quoted(archive):
+    _add_blog(archive, 'a', 'standing desks for small offices', 'o1')
+    for query in ['desk" OR', 'NOT desk', 'desk*', 'NEAR(desk office)', "office's - desk:"]:
+        assert [row['id'] for row in archive.search(query, None)] == [1]
+    assert archive.search('***', None) == []
+
+
+def test_search_ranks_and_filters_kinds(archive):
+    _add_blog(archive, 'a', 'standing desks for small offices', 'o1')
+    _add_blog(archive, 'a', 'ergonomic chairs', 'o2')
+    archive.add_faq('A blog about desks', 5, '1. Question: Desk?\nAnswer: Yes.', 'a')
+    assert archive.search('ergonomic chairs', None)[0]['id'] == 2
+    assert {row['kind'] for row in archive.search('desks', None, kinds=['faq'])} == {'faq'}
+
+
+def test_entries_are_scoped_to_their_session(archive):
+    _add_blog(archive, 'a', 'standing desks for small offices', 'o1')
+    assert [row['id'] for row in archive.search('desks', 'a')] == [1]
+    assert archive.search('desks', 'b') == []
+    assert archive.get(1, 'a')['params']['prompt'] == 'standing desks for small offices'
+    assert archive.get(1, 'b') is None
+    assert archive.get(1, None) is not None
+
+
+def test_find_seed(archive):
+    form_data = _add_blog(archive, 'a', 'standing desks for small offices', 'o1')
+    archive.add_faq('standing desks for small offices', 5, '1. Question: Desk?\nAnswer: Yes.', 'a')
+    assert archive.find_seed(form_data, 'auto', 'a')['id'] == 1
+    assert archive.find_seed(form_data, '1', 'a')['sections']['s2'].startswith('Buying Guide')
+    assert archive.find_seed(form_data, 'auto', 'b') is None
+    assert archive.find_seed(form_data, '1', 'b') is None
+    # FAQ entries have no sections to adapt
+    assert archive.find_seed(form_data, '2', 'a') is None
+    assert archive.find_seed(form_data, 'x', 'a') is None
+
+
+def test_updates_and_deletes_keep_the_index_in_sync(archive):
+    _add_blog(archive, 'a', 'standing desks for small offices', 'o1')
+    archive.update_blog('o1', {'sections': {'s1': 'Treadmill walking pads'}, 'summary': 'Walking pads'})
+    assert archive.search('summary', 'a') == []
+    assert [row['id'] for row in archive.search('treadmill', 'a')] == [1]
+    with archive._db() as conn:
+        conn.execute('DELETE FROM entries WHERE id = 1')
+        conn.execute("INSERT INTO entries_fts(entries_fts) VALUES ('integrity-check')")
+    assert archive.search('treadmill', None) == []
+
+
+def test_existing_archives_gain_the_sid_column(tmp_path):
+    path = str(tmp_path / 'old.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE entries (id INTEGER PRIMARY KEY, created REAL NOT NULL, kind TEXT NOT NULL,
+                    outline_id TEXT UNIQUE, params TEXT NOT NULL, topic TEXT NOT NULL DEFAULT '',
+                    keywords TEXT NOT NULL DEFAULT '', outline TEXT, outline_json TEXT, sections TEXT,
+                    content TEXT, summary TEXT, faq TEXT)""")
+    conn.commit()
+    conn.close()
+    archive = app.BlogArchive(path)
+    archive.add_faq('blog', 5, 'faq', 'a')
+    assert archive.get(1, 'a')['sid'] == 'a'
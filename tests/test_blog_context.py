@@ -0,0 +1,84 @@
+import app
+
+PREFIX = 'Blog brief and keyword rules. ' * 20
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+        self.prompts = []
+
+    def generate_content(self, text, **kwargs):
+        self.prompts.append(text)
+        return ['token']
+
+
+class FakeCache:
+    def __init__(self):
+        self.deleted = 0
+
+    def delete(self):
+        self.deleted += 1
+
+
+def _setup(monkeypatch, min_tokens=1):
+    monkeypatch.setattr(app, 'GEMINI_CACHE_MIN_TOKENS', min_tokens)
+    inline = {}
+    cached = {}
+
+    def model_factory(name):
+        return inline.setdefault(name, FakeModel(name))
+
+    def cache_factory(name, prefix):
+        assert prefix == PREFIX
+        cached[name] = (FakeModel(name), FakeCache())
+        return cached[name]
+
+    router = app.ModelRouter({'heavy': ['a', 'b']}, {}, model_factory=model_factory)
+    return router, inline, cached, cache_factory
+
+
+def test_cached_path_sends_only_the_body(monkeypatch):
+    router, inline, cached, cache_factory = _setup(monkeypatch)
+    context = app.BlogContext(PREFIX, cache_factory=cache_factory)
+    router.generate('Write section one', 'section', context)
+    router.generate('Write section two', 'section', context)
+    assert list(cached) == ['a']
+    assert cached['a'][0].prompts == ['Write section one', 'Write section two']
+    assert inline == {}
+    assert router.ttft_report()['cached']['calls'] == 2
+    assert router.ttft_report()['inline']['calls'] == 0
+
+
+def test_close_deletes_every_cache_once(monkeypatch):
+    router, _, cached, cache_factory = _setup(monkeypatch)
+    with app.BlogContext(PREFIX, cache_factory=cache_factory) as context:
+        context.bind('a', router, 'body')
+        context.bind('b', router, 'body')
+    assert [cache.deleted for _, cache in cached.values()] == [1, 1]
+    context.close()
+    assert [cache.deleted for _, cache in cached.values()] == [1, 1]
+
+
+def test_small_prefix_is_sent_inline(monkeypatch):
+    router, inline, cached, cache_factory = _setup(monkeypatch, min_tokens=10 ** 6)
+    with app.BlogContext(PREFIX, cache_factory=cache_factory) as context:
+        router.generate('Write section one', 'section', context)
+    assert cached == {}
+    assert inline['a'].prompts == [f"{PREFIX}\n\nWrite section one"]
+    assert router.ttft_report()['inline']['calls'] == 1
+
+
+def test_failed_cache_falls_back_to_inline(monkeypatch):
+    router, inline, _, _ = _setup(monkeypatch)
+    attempts = []
+
+    def cache_factory(name, prefix):
+        attempts.append(name)
+        raise RuntimeError('caching not supported')
+
+    with app.BlogContext(PREFIX, cache_factory=cache_factory) as context:
+        router.generate('one', 'section', context)
+        router.generate('two', 'section', context)
+    assert attempts == ['a']
+    assert inline['a'].prompts == [f"{PREFIX}\n\none", f"{PREFIX}\n\ntwo"]
@@ -0,0 +1,38 @@
+import app
+
+
+def _chunks(text, max_words):
+    return [text[start:end] for start, end in app.chunk_spans(text, max_words)]
+
+
+def test_empty_text_has_no_chunks():
+    assert app.chunk_spans('', 5) == []
+    assert app.chunk_spans('   \n\n ', 5) == []
+
+
+def test_chunks_end_on_sentence_boundaries():
+    text = 'One two three. Four five six. Seven eight nine. Ten eleven twelve.'
+    assert _chunks(text, 6) == ['One two three. Four five six.', 'Seven eight nine. Ten eleven twelve.']
+
+
+def test_whitespace_between_chunks_is_left_out():
+    text = 'Para one has words here.\n\nPara two has more words.'
+    spans = app.chunk_spans(text, 5)
+    assert [text[start:end] for start, end in spans] == ['Para one has words here.', 'Para two has more words.']
+    assert text[spans[0][1]:spans[1][0]] == '\n\n'
+
+
+def test_chunks_are_balanced_and_cover_every_word():
+    text = ' '.join(f'Sentence {i} has four words.' for i in range(9))
+    chunks = _chunks(text, 12)
+    sizes = [len(chunk.split()) for chunk in chunks]
+    assert max(sizes) <= 12
+    assert max(sizes) - min(sizes) <= 5
+    assert ' '.join(chunks).split() == text.split()
+
+
+def test_run_on_sentence_never_exceeds_max_words():
+    text = ' '.join(['word'] * 20) + '.'
+    chunks = _chunks(text, 5)
+    assert all(len(chunk.split()) <= 5 for chunk in chunks)
+    assert sum(len(chunk.split()) for chunk in chunks) == 20
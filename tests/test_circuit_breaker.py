@@ -0,0 +1,50 @@
+import app
+
+
+def _open_breaker(reset_seconds=0):
+    breaker = app.CircuitBreaker('test', failure_threshold=2, reset_seconds=reset_seconds)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_threshold():
+    breaker = app.CircuitBreaker('test', failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.retry_after() > 0
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = _open_breaker()
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes():
+    breaker = _open_breaker()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker = _open_breaker(reset_seconds=60)
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_cancelled_probe_can_be_retried():
+    breaker = _open_breaker()
+    assert breaker.allow()
+    breaker.cancel_probe()
+    assert breaker.allow()
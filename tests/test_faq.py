@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import app
+
+PLAIN_BLOG = '\n\n'.join(' '.join(f'Paragraph {i} sentence {j} is here.' for j in range(6)) for i in range(12))
+
+
+def test_blog_without_headings_splits_between_paragraphs():
+    parts = app.split_blog_parts(PLAIN_BLOG, 7)
+    assert len(parts) == 7
+    assert all(headings == [] for headings, _ in parts)
+    assert ' '.join(text for _, text in parts).split() == PLAIN_BLOG.split()
+
+
+def test_single_paragraph_splits_between_sentences():
+    blog = ' '.join(f'Sentence {j} is quite short.' for j in range(60))
+    parts = app.split_blog_parts(blog, 4)
+    assert len(parts) == 4
+    assert all(text.endswith('.') for _, text in parts)
+
+
+def test_headings_are_kept_with_their_piece():
+    blog = '\n\n'.join(f'## Part {i}\n\n' + ' '.join(f'Point {i} line {j}.' for j in range(10)) for i in range(6))
+    parts = app.split_blog_parts(blog, 3)
+    assert [headings for headings, _ in parts] == [['Part 0', 'Part 1'], ['Part 2', 'Part 3'], ['Part 4', 'Part 5']]
+
+
+def test_merge_interleaves_and_drops_near_duplicates():
+    first = "1. Question: How tall should a standing desk be?\nAnswer: Elbow height.\n\n" \
+            "2. Question: Do standing desks help posture?\nAnswer: They can."
+    second = "1. Question: How tall should my standing desk be?\nAnswer: Elbow height.\n\n" \
+             "2. Question: Which motor is quietest?\nAnswer: Dual motors."
+    merged = app.merge_faq_lists([first, second], 10)
+    questions = [body.split('\n')[0] for _, body in app.parse_faq_items(merged)]
+    assert questions == ['Question: How tall should a standing desk be?',
+                         'Question: Do standing desks help posture?',
+                         'Question: Which motor is quietest?']
+    assert merged.startswith('1. ') and '\n\n3. ' in merged
+
+
+def test_merge_stops_at_faq_count():
+    topics = ['height', 'motors', 'posture', 'warranty', 'assembly']
+    faq = '\n\n'.join(f"{i}. Question: What about {topic}?\nAnswer: Yes." for i, topic in enumerate(topics, 1))
+    assert len(app.parse_faq_items(app.merge_faq_lists([faq], 3))) == 3
+
+
+def test_format_faq_numbers_schema_output():
+    text = json.dumps([{'question': ' Why? ', 'answer': 'Because. '}, {'question': 'How?', 'answer': 'So.'}])
+    assert app.format_faq(text) == "1. Question: Why?\nAnswer: Because.\n\n2. Question: How?\nAnswer: So."
+
+
+def test_format_faq_rejects_truncated_output():
+    with pytest.raises(ValueError):
+        app.format_faq('[{"question": "Why')
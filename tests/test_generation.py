@@ -0,0 +1,69 @@
+import pytest
+
+import app
+
+
+def test_overrides_accept_json_strings():
+    assert app.parse_generation_overrides('{"section": {"temperature": 0.5}}') == {'section': {'temperature': 0.5}}
+    assert app.parse_generation_overrides('') == {}
+
+
+@pytest.mark.parametrize('raw', [
+    [1, 2],
+    {'nonexistent': {}},
+    {'section': {'seed': 1}},
+    {'section': {'temperature': 'hot'}},
+    {'section': {'temperature': float('nan')}},
+    {'section': {'stop_sequences': 'END'}},
+    {'section': {'stop_sequences': ['a', 'b', 'c', 'd', 'e', 'f']}},
+])
+def test_invalid_overrides_are_rejected(raw):
+    with pytest.raises(ValueError):
+        app.parse_generation_overrides(raw)
+
+
+def test_numbers_are_clamped():
+    overrides = app.parse_generation_overrides(
+        {'section': {'temperature': 9, 'top_p': -1, 'max_output_words': 1e9}})
+    assert overrides == {'section': {'temperature': 2.0, 'top_p': 0.0, 'max_output_words': 6144}}
+
+
+def test_max_output_words_only_lowers_the_derived_cap():
+    profile = app.GenerationProfile(max_output_words=6144)
+    assert profile.config(300) == app.GenerationProfile().config(300)
+    assert app.GenerationProfile(max_output_words=100).config(300)['max_output_tokens'] == 256
+    assert app.GenerationProfile(headroom=2.0).config(10000)['max_output_tokens'] == app.MAX_OUTPUT_TOKENS
+
+
+class _Rejected(Exception):
+    code = 400
+
+
+def test_client_errors_do_not_degrade_models():
+    calls = []
+
+    class Model:
+        def generate_content(self, text, **kwargs):
+            calls.append(text)
+            raise _Rejected('temperature out of range')
+
+    router = app.ModelRouter({'heavy': ['a', 'b']}, {}, model_factory=lambda name: Model())
+    with pytest.raises(_Rejected):
+        router.generate('prompt', 'section')
+    assert len(calls) == 1
+    assert router.snapshot() == {}
+
+
+def test_server_errors_fail_over():
+    class Failing:
+        def generate_content(self, text, **kwargs):
+            raise RuntimeError('unavailable')
+
+    class Working:
+        def generate_content(self, text, **kwargs):
+            return ['chunk']
+
+    router = app.ModelRouter({'heavy': ['a', 'b']}, {}, model_factory=lambda name: Failing() if name == 'a' else Working())
+    assert router.generate('prompt', 'section') == ['chunk']
+    assert router.snapshot()['a']['errors'] == 1
+    assert router.snapshot()['b']['errors'] == 0
@@ -0,0 +1,29 @@
+import app
+
+
+def test_readyz_requires_both_keys(monkeypatch):
+    client = app.app.test_client()
+    monkeypatch.setattr(app, 'GEMINI_API_KEY', 'gemini')
+    monkeypatch.setattr(app, 'HIX_API_KEY', 'hix')
+    response = client.get('/readyz')
+    assert response.status_code == 200
+    assert response.json['ready'] is True
+
+    monkeypatch.setattr(app, 'HIX_API_KEY', None)
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.json['hix_key'] is False
+
+
+def test_humanize_uses_the_key_readyz_checks(monkeypatch):
+    keys = []
+
+    def humanize_chunk(chunk, api_key):
+        keys.append(api_key)
+        return chunk, 'hix'
+
+    monkeypatch.setattr(app, '_humanize_chunk', humanize_chunk)
+    monkeypatch.setattr(app, 'HIX_API_KEY', 'from-environment')
+    response = app.app.test_client().post('/humanize', json={'content': ' '.join(['word'] * 60)})
+    assert response.status_code == 200
+    assert keys == ['from-environment']
@@ -0,0 +1,50 @@
+import app
+
+
+def _fake_hix(monkeypatch, rewrite=lambda chunk: chunk):
+    keys = []
+
+    def humanize_chunk(chunk, api_key):
+        keys.append(api_key)
+        assert '**' not in chunk
+        return rewrite(chunk), 'hix'
+
+    monkeypatch.setattr(app, '_humanize_chunk', humanize_chunk)
+    return keys
+
+
+def test_every_bold_occurrence_is_restored(monkeypatch):
+    _fake_hix(monkeypatch, lambda chunk: chunk.replace('Sentence', 'Line'))
+    text = ' '.join(f'Sentence {i} mentions a **standing desk** once.' for i in range(12))
+    humanized = app.humanize_text(text, min_words=10)
+    assert humanized.count('**standing desk**') == 12
+    assert humanized.startswith('Line 0')
+
+
+def test_bold_is_not_added_beyond_the_original_count(monkeypatch):
+    _fake_hix(monkeypatch)
+    text = 'A **standing desk** helps. ' + ' '.join(['A standing desk is tall.'] * 12)
+    humanized = app.humanize_text(text, min_words=10)
+    assert humanized.count('**standing desk**') == 1
+
+
+def test_structure_is_not_sent(monkeypatch):
+    _fake_hix(monkeypatch, str.upper)
+    prose = ' '.join(['word'] * 60)
+    text = f'## Heading\n\n{prose}\n\n```\ncode\n```'
+    assert app.humanize_text(text) == f'## Heading\n\n{prose.upper()}\n\n```\ncode\n```'
+
+
+def test_uses_the_configured_key(monkeypatch):
+    keys = _fake_hix(monkeypatch)
+    monkeypatch.setattr(app, 'HIX_API_KEY', 'configured')
+    app.humanize_text(' '.join(['word'] * 60))
+    assert keys == ['configured']
+
+
+def test_without_a_key_text_is_unchanged(monkeypatch):
+    keys = _fake_hix(monkeypatch, str.upper)
+    monkeypatch.setattr(app, 'HIX_API_KEY', None)
+    text = ' '.join(['word'] * 60)
+    assert app.humanize_text(text) == text
+    assert keys == []
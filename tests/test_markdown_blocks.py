@@ -0,0 +1,55 @@
+import app
+
+DOCUMENT = """# Title
+
+Some prose here.
+More prose.
+
+- item one
+  continued
+- item two
+
+```
+code
+
+# not a heading
+```
+
+| a | b |
+
+Trailing prose"""
+
+
+def _blocks(text):
+    return [(kind, text[start:end]) for kind, start, end in app.parse_markdown_blocks(text)]
+
+
+def test_blocks_in_document_order():
+    assert _blocks(DOCUMENT) == [
+        ('heading', '# Title'),
+        ('prose', 'Some prose here.\nMore prose.'),
+        ('list', '- item one\n  continued'),
+        ('list', '- item two'),
+        ('code', '```\ncode\n\n# not a heading\n```'),
+        ('other', '| a | b |'),
+        ('prose', 'Trailing prose'),
+    ]
+
+
+def test_blank_lines_are_not_covered():
+    covered = set()
+    for _, start, end in app.parse_markdown_blocks(DOCUMENT):
+        covered.update(range(start, end))
+    assert not ''.join(DOCUMENT[i] for i in range(len(DOCUMENT)) if i not in covered).strip()
+
+
+def test_heading_ends_prose_without_blank_line():
+    assert _blocks('Intro line\n## Next\nBody') == [('prose', 'Intro line'), ('heading', '## Next'), ('prose', 'Body')]
+
+
+def test_unclosed_fence_runs_to_end():
+    assert app.parse_markdown_blocks('```\nunclosed\ncode') == [('code', 0, 17)]
+
+
+def test_empty_text():
+    assert app.parse_markdown_blocks('') == []
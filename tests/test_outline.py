@@ -0,0 +1,97 @@
+import app
+
+MARKDOWN_OUTLINE = """## Blog Outline: Standing Desks
+
+## Introduction
+* Why posture matters for people who work at a desk all day
+* What this guide covers
+
+## Choosing a Desk
+* Motor types, height range and load capacity compared
+* Desktop sizes for one or two monitors
+
+## Conclusion
+* Recap of the main buying points and a final recommendation
+"""
+
+
+def test_markdown_headings_start_sections():
+    sections = app.parse_outline_sections(MARKDOWN_OUTLINE)
+    assert len(sections) == 3
+    assert sections[0].startswith('## Blog Outline')
+    assert '## Introduction' in sections[0]
+    assert sections[1].startswith('## Choosing a Desk')
+    assert sections[2].startswith('## Conclusion')
+
+
+def test_plain_heading_matches_top_level_pattern():
+    assert app._OUTLINE_TOP_RE.match('## Introduction')
+    assert app._OUTLINE_TOP_RE.match('**II. Product Overview**')
+    assert not app._OUTLINE_TOP_RE.match('* Hook: a bullet point')
+
+
+def test_preamble_title_is_not_the_section_title():
+    outline = app.Outline.parse(MARKDOWN_OUTLINE)
+    assert [section.title for section in outline] == ['Introduction', 'Choosing a Desk', 'Conclusion']
+
+
+def test_max_sections_merges_neighbours():
+    assert len(app.parse_outline_sections(MARKDOWN_OUTLINE, max_sections=2)) == 2
+
+
+LONG_TITLE_OUTLINE = """## Blog Outline: The Ultimate Guide to Choosing the Perfect Standing Desk for Your Home Office
+
+## Introduction
+* Why posture matters for people who work at a desk all day
+
+## Choosing a Desk
+* Motor types, height range and load capacity compared
+
+## Setting It Up
+* Monitor height, keyboard position and anti-fatigue mats
+
+## Conclusion
+* Recap of the main buying points and a final recommendation
+"""
+
+
+def test_long_title_line_is_merged_into_the_first_section():
+    outline = app.Outline.parse(LONG_TITLE_OUTLINE)
+    assert [section.title for section in outline] == ['Introduction', 'Choosing a Desk', 'Setting It Up', 'Conclusion']
+    assert outline.section('s1').points[-1][2].startswith('Why posture matters')
+
+
+def test_flat_numbered_outline_keeps_every_line():
+    flat = '\n'.join(f"{i}. Section {i} covers one distinct part of the topic in detail" for i in range(1, 5))
+    assert len(app.parse_outline_sections(flat)) == 4
+
+
+NESTED_OUTLINE = """**I. Introduction**
+* **Hook:** Start with a **surprising** statistic about sitting
+* Overview of the guide
+    * What readers will learn
+        * A detail under that
+
+**II. Buying Guide**
+* **Motors:** single versus dual
+"""
+
+
+def test_bold_inside_points_is_unwrapped():
+    outline = app.Outline.parse(NESTED_OUTLINE)
+    assert outline.section('s1').title == 'I. Introduction'
+    assert outline.section('s1').points[0][2] == 'Hook: Start with a surprising statistic about sitting'
+    assert outline.section('s2').points[0][2] == 'Motors: single versus dual'
+
+
+def test_depth_follows_relative_indentation():
+    outline = app.Outline.parse(NESTED_OUTLINE)
+    assert [depth for _, depth, _ in outline.section('s1').points] == [1, 1, 2, 3]
+
+
+def test_json_round_trip_keeps_ids_titles_and_points():
+    outline = app.Outline.parse(NESTED_OUTLINE)
+    restored = app.Outline.from_json(outline.to_json())
+    assert [(s.id, s.title, s.points) for s in restored] == [(s.id, s.title, s.points) for s in outline]
+    assert restored.index('s2') == 1
+    assert restored.section('s1').points[2][0] == 's1.3'
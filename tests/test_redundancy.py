@@ -0,0 +1,80 @@
+import pytest
+
+import app
+
+FORM_DATA = {'type': 'general', 'prompt': 'standing desks', 'keywords': 'cable tray', 'primary_keywords': 'standing desk'}
+OUTLINE = app.Outline.parse("""## Introduction
+* Why standing desks matter for people who sit all day
+
+## Buying Guide
+* Motors, height range and load capacity compared side by side
+
+## Conclusion
+* Recap of the main buying points and a final recommendation
+""")
+INTRO = ("Standing desks let you switch between sitting and standing through the working day. "
+         "Most models raise the desktop with one or two electric motors under the frame.")
+BUYING = ("Check the height range against your own elbow height before you buy anything. "
+          "Dual motors lift heavier loads and usually run more quietly than single ones.")
+
+
+def test_distinct_sections_score_zero():
+    report = app.redundancy_report([('s1', INTRO), ('s2', BUYING)])
+    assert report == {'score': 0.0, 'sections': {'s1': 0.0, 's2': 0.0}, 'repeats': {}}
+
+
+def test_restated_sentences_are_attributed_to_the_later_section():
+    report = app.redundancy_report([('s1', INTRO), ('s2', BUYING + ' ' + INTRO)])
+    assert report['sections']['s1'] == 0.0
+    assert 0.4 < report['sections']['s2'] < 0.6
+    assert report['repeats']['s2'] == app._SENTENCE_SPLIT_RE.split(INTRO)
+    assert 0 < report['score'] < report['sections']['s2']
+
+
+def test_repetition_within_a_section_does_not_count():
+    assert app.redundancy_report([('s1', INTRO + ' ' + INTRO)])['score'] == 0.0
+
+
+def test_short_sentences_are_ignored():
+    assert app.redundancy_report([('s1', 'Buy one today.'), ('s2', 'Buy one today.')])['score'] == 0.0
+
+
+def _store(outline_id, conclusion):
+    app.remember_blog(outline_id, {'s1': INTRO, 's2': BUYING, 's3': conclusion}, 'Summary', FORM_DATA)
+
+
+def test_repetitive_section_is_regenerated_once(monkeypatch):
+    prompts = []
+
+    def generate_text(prompt, *args, **kwargs):
+        prompts.append(prompt)
+        return f"A fresh closing recommendation for home offices of every size.\n{app.SUMMARY_DELIMITER}\nNew summary"
+
+    monkeypatch.setattr(app, 'generate_text', generate_text)
+    _store('test-redundant', INTRO)
+    blog, report = app.reduce_redundancy(OUTLINE, 'test-redundant', FORM_DATA)
+    assert len(prompts) == 1
+    assert 'do not restate them' in prompts[0]
+    assert report['regenerated'] == 's3'
+    assert report['sections']['s3'] == 0.0
+    assert blog['summary'] == 'New summary'
+    assert app._blog_store.get('test-redundant') == blog
+
+
+def test_clean_blog_is_left_alone(monkeypatch):
+    monkeypatch.setattr(app, 'generate_text', lambda *args, **kwargs: pytest.fail('no regeneration expected'))
+    _store('test-clean', 'Pick the desk that fits your room and budget, then set it to elbow height.')
+    blog, report = app.reduce_redundancy(OUTLINE, 'test-clean', FORM_DATA)
+    assert 'regenerated' not in report
+    assert blog['sections']['s1'] == INTRO
+
+
+def test_failed_regeneration_keeps_the_blog(monkeypatch):
+    def generate_text(*args, **kwargs):
+        raise RuntimeError('upstream down')
+
+    monkeypatch.setattr(app, 'generate_text', generate_text)
+    _store('test-failed', INTRO)
+    blog, report = app.reduce_redundancy(OUTLINE, 'test-failed', FORM_DATA)
+    assert 'regenerated' not in report
+    assert blog['sections']['s3'] == INTRO
@@ -0,0 +1,27 @@
+import app
+
+
+def _blog(**sections):
+    return {'sections': sections, 'summary': 'Summary', 'keyword_usage': {key: {} for key in sections}}
+
+
+def test_concurrent_section_updates_are_both_kept():
+    outline_id = 'test-concurrent'
+    base = _blog(s1='Intro', s2='Body', s3='End')
+    app._blog_store.put(outline_id, base)
+    # Both regenerations started from the same stored copy
+    first = dict(base, sections=dict(base['sections'], s1='New intro'),
+                 keyword_usage=dict(base['keyword_usage'], s1={'desk': 1}))
+    second = dict(base, sections=dict(base['sections'], s3='New end'), summary='Newer summary')
+    app.store_regenerated_section(outline_id, 's1', first)
+    stored = app.store_regenerated_section(outline_id, 's3', second)
+    assert stored['sections'] == {'s1': 'New intro', 's2': 'Body', 's3': 'New end'}
+    assert stored['keyword_usage']['s1'] == {'desk': 1}
+    assert stored['summary'] == 'Newer summary'
+    assert app._blog_store.get(outline_id) == stored
+
+
+def test_expired_blog_is_stored_again():
+    blog = _blog(s1='Intro')
+    assert app.store_regenerated_section('test-expired', 's1', blog) == blog
+    assert app._blog_store.get('test-expired') == blog
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+def _scheduler(capacity=2, timeout=5):
+    return app.UpstreamScheduler(capacity=capacity, reserved={'interactive': 1, 'generation': 0, 'batch': 0},
+                                 weights={'interactive': 4, 'generation': 2, 'batch': 1}, timeout=timeout)
+
+
+def _wait_for_waiting(scheduler, count):
+    deadline = time.monotonic() + 5
+    while sum(scheduler.snapshot()['waiting'].values()) < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_capacity_must_exceed_reservations():
+    with pytest.raises(ValueError):
+        app.UpstreamScheduler(capacity=3, reserved={'interactive': 2, 'generation': 1, 'batch': 0})
+
+
+def test_reserved_slot_is_kept_for_its_lane():
+    scheduler = _scheduler(timeout=0.05)
+    scheduler.acquire('generation')
+    # The one shared slot is taken; only the interactive reservation is left
+    with pytest.raises(app.UpstreamBusyError):
+        scheduler.acquire('batch')
+    scheduler.acquire('interactive')
+    assert scheduler.snapshot()['in_flight'] == {'interactive': 1, 'generation': 1, 'batch': 0}
+
+
+def test_timed_out_call_leaves_the_queue():
+    scheduler = _scheduler(timeout=0.05)
+    scheduler.acquire('generation')
+    with pytest.raises(app.UpstreamBusyError) as excinfo:
+        scheduler.acquire('generation')
+    assert excinfo.value.retry_after > 0
+    assert scheduler.snapshot()['waiting'] == {'interactive': 0, 'generation': 0, 'batch': 0}
+    scheduler.release('generation')
+    scheduler.acquire('generation')
+
+
+def test_sessions_are_served_in_fair_order():
+    scheduler = _scheduler(capacity=2)
+    scheduler.acquire('interactive')
+    scheduler.acquire('batch', 'busy')
+    order = []
+
+    def call(session_id):
+        scheduler.acquire('batch', session_id)
+        order.append(session_id)
+        scheduler.release('batch')
+
+    threads = []
+    # One session queues three calls before another session's single call
+    for session_id in ('busy', 'busy', 'busy', 'quiet'):
+        thread = threading.Thread(target=call, args=(session_id,))
+        thread.start()
+        threads.append(thread)
+        _wait_for_waiting(scheduler, len(threads))
+    scheduler.release('batch')
+    for thread in threads:
+        thread.join(5)
+    assert order.index('quiet') <= 1
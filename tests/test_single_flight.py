@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+def _run_with_follower(flight, key, func, started, release):
+    """Start a leader on key, then a follower once the leader is running."""
+    outcomes = {}
+
+    def call(name):
+        try:
+            outcomes[name] = ('result', flight.do(key, func))
+        except Exception as e:
+            outcomes[name] = ('error', e)
+
+    leader = threading.Thread(target=call, args=('leader',))
+    leader.start()
+    assert started.wait(5)
+    follower = threading.Thread(target=call, args=('follower',))
+    follower.start()
+    deadline = time.monotonic() + 5
+    while flight.coalesced == 0:
+        assert time.monotonic() < deadline, 'follower never joined the flight'
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    return outcomes
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = app.SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'done'
+
+    outcomes = _run_with_follower(flight, 'key', work, started, release)
+    assert outcomes == {'leader': ('result', 'done'), 'follower': ('result', 'done')}
+    assert len(calls) == 1
+    assert flight.coalesced == 1
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = app.SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    error = RuntimeError('upstream failed')
+
+    def work():
+        started.set()
+        release.wait(5)
+        raise error
+
+    outcomes = _run_with_follower(flight, 'key', work, started, release)
+    assert outcomes['leader'] == ('error', error)
+    assert outcomes['follower'] == ('error', error)
+
+
+def test_key_is_released_after_a_call():
+    flight = app.SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do('key', lambda: int('x'))
+    assert flight.do('key', lambda: 1) == 1
+    assert flight.do('key', lambda: 2) == 2
+    assert flight.coalesced == 0